@@ -205,7 +205,7 @@ export function LLMChat() {
       eventSource.addEventListener('chunk', (event) => {
         hasReceivedData = true
         try {
-          const chunkData = event.data
+          const chunkData = JSON.parse(event.data).t
           setMessages((prev) =>
             prev.map((msg) =>
               msg.id === assistantMessage.id
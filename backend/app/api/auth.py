@@ -1,8 +1,13 @@
 from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
+from cachetools import TTLCache
+import hashlib
 import logging
+import os
+import time
 
 from ..auth.auth_service import auth_service, AuthError, UserAlreadyExistsError
 from ..auth.user_manager import user_manager, WorkspaceError
@@ -12,6 +17,13 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 security = HTTPBearer(auto_error=False)
 
+# Short-lived cache of verified JWT payloads so repeated requests with the same
+# token skip signature verification. Keyed by a digest of the token so raw
+# tokens are never kept in memory.
+TOKEN_CACHE_TTL_SECONDS = int(os.getenv("JWT_CACHE_TTL_SECONDS", "30"))
+TOKEN_CACHE_MAX_SIZE = int(os.getenv("JWT_CACHE_MAX_SIZE", "10000"))
+_token_cache: TTLCache = TTLCache(maxsize=TOKEN_CACHE_MAX_SIZE, ttl=TOKEN_CACHE_TTL_SECONDS)
+
 # Pydantic models
 class UserCreate(BaseModel):
     username: str
@@ -39,6 +51,30 @@ class SessionStatus(BaseModel):
     workspace: Optional[Dict[str, Any]]
     session_duration_minutes: int
 
+def _token_cache_key(token: str) -> bytes:
+    """Digest used to key the verified-token cache"""
+    return hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+
+async def verify_token_cached(token: str) -> Dict[str, Any]:
+    """
+    Verify JWT token, reusing a recent verification of the same token
+    
+    Cache misses are verified in the threadpool so signature checks
+    don't block the event loop.
+    
+    Raises:
+        AuthError: If token is invalid or expired
+    """
+    key = _token_cache_key(token)
+    payload = _token_cache.get(key)
+    if payload is not None and payload["exp"] > time.time():
+        return payload
+    
+    payload = await run_in_threadpool(auth_service.verify_token, token)
+    if "exp" in payload:
+        _token_cache[key] = payload
+    return payload
+
 # Dependency to get current user from JWT token
 async def get_current_user_from_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict[str, Any]:
     """Extract and validate current user from JWT token"""
@@ -49,16 +85,23 @@ async def get_current_user_from_token(credentials: HTTPAuthorizationCredentials
         )
     
     try:
-        payload = auth_service.verify_token(credentials.credentials)
-        current_user = user_manager.get_current_user()
+        payload = await verify_token_cached(credentials.credentials)
         
-        if not current_user or current_user.get("user_id") != payload.get("user_id"):
+        # Tokens are only honoured for the user whose session is mounted, so
+        # logging out (or another user logging in) revokes older tokens
+        session_user = user_manager.get_current_user()
+        if not session_user or session_user.get("user_id") != payload["user_id"]:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid authentication credentials"
             )
         
-        return current_user
+        # Identity comes straight from the verified claims
+        return {
+            "user_id": payload["user_id"],
+            "username": payload["username"],
+            "workspace_id": payload["workspace_id"]
+        }
         
     except AuthError as e:
         raise HTTPException(
@@ -175,24 +218,3 @@ async def get_session_status():
             workspace=None,
             session_duration_minutes=0
         )
-
-# OPTIONS handlers for CORS preflight
-@router.options("/register")
-async def register_options():
-    """CORS preflight for register"""
-    return {"message": "OK"}
-
-@router.options("/login")
-async def login_options():
-    """CORS preflight for login"""
-    return {"message": "OK"}
-
-@router.options("/logout")
-async def logout_options():
-    """CORS preflight for logout"""
-    return {"message": "OK"}
-
-@router.options("/me")
-async def me_options():
-    """CORS preflight for me"""
-    return {"message": "OK"}
\ No newline at end of file
@@ -1,21 +1,46 @@
 import os
+import asyncio
+import base64
 import hashlib
-from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, status, Query
+import tempfile
+from datetime import datetime
+from types import MappingProxyType
+from typing import List, Optional, Dict, Any, Tuple, Union
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, UploadFile, File, status, Query
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
-from sqlalchemy import select, delete, func
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, delete, func, tuple_
 import logging
 
 from ..auth.auth_service import auth_service
 from ..auth.user_manager import user_manager, WorkspaceError
 from ..core.database_manager import database_manager
 from ..models.document import Document, DocumentChunk
-from ..services.document_processor_api import DocumentProcessor, DocumentProcessingError
+from ..services.document_processor_api import get_document_processor, DocumentProcessingError
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+# orjson serializes the datetime-heavy document payloads natively
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# Upload limits
+MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+# Processing status -> progress percentage / current stage
+PROCESSING_PROGRESS = MappingProxyType({
+    "pending": 0,
+    "processing": 50,
+    "completed": 100,
+    "failed": 30  # Failed partway through
+})
+
+PROCESSING_STAGES = MappingProxyType({
+    "pending": "queued",
+    "processing": "pdf_extraction",
+    "completed": "completed",
+    "failed": "pdf_extraction"
+})
 
 # Pydantic models for API responses
 class DocumentResponse(BaseModel):
@@ -30,8 +55,8 @@ class DocumentResponse(BaseModel):
     total_chunks: Optional[int]
     processing_status: str
     error_message: Optional[str]
-    created_at: str
-    processed_at: Optional[str]
+    created_at: datetime
+    processed_at: Optional[datetime]
     workspace_id: int
 
 class DocumentChunkResponse(BaseModel):
@@ -47,6 +72,7 @@ class DocumentListResponse(BaseModel):
     total: int
     offset: int = 0
     limit: int = 50
+    next_cursor: Optional[str] = None
 
 class DocumentDetailsResponse(DocumentResponse):
     chunks: List[DocumentChunkResponse]
@@ -68,7 +94,7 @@ class ProcessingStatusResponse(BaseModel):
     processing_time_seconds: Optional[float] = None
 
 class SearchResult(BaseModel):
-    document_id: int
+    document_id: Union[int, str]
     filename: str
     relevance_score: float
     matched_chunks: List[Dict[str, Any]]
@@ -81,138 +107,230 @@ class SearchResponse(BaseModel):
 # Import the existing auth dependency
 from ..api.auth import get_current_user_from_token
 
+# Column sets selected for API responses; Core selects skip ORM instantiation
+DOCUMENT_COLUMNS = (
+    Document.id,
+    Document.filename,
+    Document.original_filename,
+    Document.file_path,
+    Document.file_size,
+    Document.content_hash,
+    Document.mime_type,
+    Document.total_pages,
+    Document.total_chunks,
+    Document.processing_status,
+    Document.error_message,
+    Document.created_at,
+    Document.processed_at,
+    Document.workspace_id,
+)
+
+CHUNK_COLUMNS = (
+    DocumentChunk.id,
+    DocumentChunk.chunk_index,
+    DocumentChunk.page_number,
+    DocumentChunk.char_count,
+    DocumentChunk.token_count,
+    DocumentChunk.vector_id,
+)
+
 # Helper functions
-async def get_user_documents(workspace_id: int, offset: int = 0, limit: int = 50) -> List[Dict[str, Any]]:
-    """Get all documents for a workspace"""
+def document_row_to_dict(row) -> Dict[str, Any]:
+    """Convert a document row mapping to a response dict"""
+    return {column.key: row[column.key] for column in DOCUMENT_COLUMNS}
+
+def encode_document_cursor(created_at: datetime, document_id: int) -> str:
+    """Encode a (created_at, id) keyset position as an opaque cursor"""
+    raw = f"{created_at.isoformat()}|{document_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_document_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor produced by encode_document_cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, document_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(document_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+async def fetch_document_rows(query) -> List[Any]:
+    """Run a document select on its own session and return row mappings"""
+    async with database_manager.get_session() as db:
+        result = await db.execute(query)
+        return result.mappings().all()
+
+async def count_user_documents(workspace_id: int) -> int:
+    """Count all documents in a workspace"""
     async with database_manager.get_session() as db:
-        query = select(Document).where(
+        count_query = select(func.count(Document.id)).where(
             Document.workspace_id == workspace_id
-        ).offset(offset).limit(limit).order_by(Document.created_at.desc())
+        )
+        result = await db.execute(count_query)
+        return result.scalar() or 0
+
+async def get_user_documents(
+    workspace_id: int,
+    offset: int = 0,
+    limit: int = 50,
+    cursor: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], int, Optional[str]]:
+    """
+    Get a page of documents for a workspace
+    
+    Pages are ordered newest first. When a cursor is given the page starts
+    after that (created_at, id) position and offset is ignored.
+    
+    Returns:
+        Tuple of (documents, workspace total, cursor for the next page)
+    """
+    order_by = (Document.created_at.desc(), Document.id.desc())
+    
+    if cursor:
+        last_created_at, last_id = decode_document_cursor(cursor)
+        query = select(*DOCUMENT_COLUMNS).where(
+            Document.workspace_id == workspace_id,
+            tuple_(Document.created_at, Document.id) < (last_created_at, last_id)
+        ).order_by(*order_by).limit(limit)
+        
+        # A window count would only cover rows after the cursor, so count the
+        # workspace separately; the two queries are independent and run concurrently
+        rows, total = await asyncio.gather(
+            fetch_document_rows(query),
+            count_user_documents(workspace_id)
+        )
+    else:
+        # COUNT(*) OVER () returns the total alongside the page in one round-trip
+        query = select(
+            *DOCUMENT_COLUMNS,
+            func.count().over().label("total")
+        ).where(
+            Document.workspace_id == workspace_id
+        ).order_by(*order_by).offset(offset).limit(limit)
         
-        result = await db.execute(query)
-        documents = result.scalars().all()
+        rows = await fetch_document_rows(query)
         
-        return [
-            {
-                "id": doc.id,
-                "filename": doc.filename,
-                "original_filename": doc.original_filename,
-                "file_path": doc.file_path,
-                "file_size": doc.file_size,
-                "content_hash": doc.content_hash,
-                "mime_type": doc.mime_type,
-                "total_pages": doc.total_pages,
-                "total_chunks": doc.total_chunks,
-                "processing_status": doc.processing_status,
-                "error_message": doc.error_message,
-                "created_at": doc.created_at.isoformat() if doc.created_at else None,
-                "processed_at": doc.processed_at.isoformat() if doc.processed_at else None,
-                "workspace_id": doc.workspace_id
-            }
-            for doc in documents
-        ]
+        if rows:
+            total = rows[0]["total"]
+        elif offset:
+            # Page is past the end; the window count has no row to ride on
+            total = await count_user_documents(workspace_id)
+        else:
+            total = 0
+    
+    next_cursor = None
+    if len(rows) == limit and rows[-1]["created_at"]:
+        next_cursor = encode_document_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    
+    return [document_row_to_dict(row) for row in rows], total, next_cursor
 
 async def get_document_details(document_id: int, workspace_id: int) -> Optional[Dict[str, Any]]:
     """Get detailed document information including chunks"""
     async with database_manager.get_session() as db:
-        query = select(Document).where(
+        query = select(*DOCUMENT_COLUMNS).where(
             Document.id == document_id,
             Document.workspace_id == workspace_id
-        ).options(selectinload(Document.chunks))
+        )
         
         result = await db.execute(query)
-        document = result.scalar_one_or_none()
+        row = result.mappings().one_or_none()
         
-        if not document:
+        if not row:
             return None
         
         # Get document chunks
-        chunks_query = select(DocumentChunk).where(
+        chunks_query = select(*CHUNK_COLUMNS).where(
             DocumentChunk.document_id == document_id
         ).order_by(DocumentChunk.chunk_index)
         
         chunks_result = await db.execute(chunks_query)
-        chunks = chunks_result.scalars().all()
         
-        return {
-            "id": document.id,
-            "filename": document.filename,
-            "original_filename": document.original_filename,
-            "file_path": document.file_path,
-            "file_size": document.file_size,
-            "content_hash": document.content_hash,
-            "mime_type": document.mime_type,
-            "total_pages": document.total_pages,
-            "total_chunks": document.total_chunks,
-            "processing_status": document.processing_status,
-            "error_message": document.error_message,
-            "created_at": document.created_at.isoformat() if document.created_at else None,
-            "processed_at": document.processed_at.isoformat() if document.processed_at else None,
-            "workspace_id": document.workspace_id,
-            "chunks": [
-                {
-                    "id": chunk.id,
-                    "chunk_index": chunk.chunk_index,
-                    "page_number": chunk.page_number,
-                    "char_count": chunk.char_count,
-                    "token_count": chunk.token_count,
-                    "vector_id": chunk.vector_id
-                }
-                for chunk in chunks
-            ]
-        }
+        document = document_row_to_dict(row)
+        document["chunks"] = [dict(chunk) for chunk in chunks_result.mappings().all()]
+        return document
 
 # API Endpoints
 
 @router.post("/upload", response_model=UploadResponse, status_code=status.HTTP_201_CREATED)
 async def upload_document(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     current_user: Dict[str, Any] = Depends(get_current_user_from_token)
 ):
-    """Upload and process a document"""
+    """Upload a document and queue it for processing"""
+    temp_file_path = None
     try:
         # Validate user workspace
         workspace_id = current_user["workspace_id"]
         await user_manager.validate_workspace_access(workspace_id)
         
-        # Validate file
+        # Validate file before reading any of the body
         if not file:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="No file provided"
             )
         
-        # Check file size (100MB limit)
-        MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB
-        content = await file.read()
-        if len(content) > MAX_FILE_SIZE:
+        if not file.filename or not file.filename.lower().endswith(".pdf"):
             raise HTTPException(
-                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                detail="File too large. Maximum size is 100MB"
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Only PDF files are supported"
             )
         
-        # Check for empty file
-        if len(content) == 0:
+        if not file.content_type or not file.content_type.startswith("application/pdf"):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="File is empty"
+                detail="Only PDF files are supported"
             )
         
-        # Validate file type
-        if not file.content_type or not file.content_type.startswith("application/pdf"):
+        # Stream upload to a temporary file, enforcing the size limit as we go
+        # and hashing the content in the same pass
+        file_size = 0
+        content_hasher = hashlib.sha256()
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
+            temp_file_path = temp_file.name
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                file_size += len(chunk)
+                if file_size > MAX_FILE_SIZE:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail="File too large. Maximum size is 100MB"
+                    )
+                content_hasher.update(chunk)
+                temp_file.write(chunk)
+        
+        # Check for empty file
+        if file_size == 0:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Only PDF files are supported"
+                detail="File is empty"
             )
         
-        # Reset file pointer for processing
-        await file.seek(0)
+        # Get document processor
+        document_processor = get_document_processor(workspace_id)
         
-        # Initialize document processor
-        document_processor = DocumentProcessor(workspace_id)
+        # Record the document as pending
+        result = await document_processor.create_document(
+            file_path=temp_file_path,
+            filename=file.filename,
+            content_type=file.content_type,
+            user_id=current_user["user_id"],
+            content_hash=content_hasher.hexdigest()
+        )
         
-        # Process document
-        result = await document_processor.process_document(file, current_user["user_id"])
+        # Extraction, chunking and indexing run after the response is sent;
+        # progress is reported through /{document_id}/status
+        background_tasks.add_task(
+            document_processor.process_in_background,
+            document_id=result["document_id"],
+            file_path=temp_file_path,
+            filename=file.filename,
+            content_hash=result["content_hash"]
+        )
+        temp_file_path = None  # Owned by the background task from here on
         
         logger.info(f"Document uploaded successfully: {file.filename} by user {current_user['username']}")
         
@@ -221,9 +339,11 @@ async def upload_document(
             filename=result["filename"],
             processing_status=result["processing_status"],
             total_chunks=result.get("total_chunks"),
-            message="Document uploaded successfully"
+            message="Document uploaded successfully, processing started"
         )
         
+    except HTTPException:
+        raise
     except WorkspaceError as e:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -246,35 +366,47 @@ async def upload_document(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Upload failed: {str(e)}"
         )
+    finally:
+        # Clean up temporary upload file
+        if temp_file_path and os.path.exists(temp_file_path):
+            try:
+                os.unlink(temp_file_path)
+            except Exception as e:
+                logger.warning(f"Failed to cleanup temp file {temp_file_path}: {e}")
 
-@router.get("/", response_model=DocumentListResponse)
+@router.get("/", responses={200: {"model": DocumentListResponse}})
 async def list_documents(
     offset: int = Query(0, ge=0, description="Number of documents to skip"),
     limit: int = Query(50, ge=1, le=100, description="Number of documents to return"),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor"),
     current_user: Dict[str, Any] = Depends(get_current_user_from_token)
 ):
     """List all documents for the current user's workspace"""
     try:
         workspace_id = current_user["workspace_id"]
         
-        # Get documents
-        documents = await get_user_documents(workspace_id, offset, limit)
-        
-        # Get total count
-        async with database_manager.get_session() as db:
-            count_query = select(func.count(Document.id)).where(
-                Document.workspace_id == workspace_id
+        # Get documents and total count
+        try:
+            documents, total, next_cursor = await get_user_documents(
+                workspace_id, offset, limit, cursor
             )
-            result = await db.execute(count_query)
-            total = result.scalar() or 0
-        
-        return DocumentListResponse(
-            documents=[DocumentResponse(**doc) for doc in documents],
-            total=total,
-            offset=offset,
-            limit=limit
-        )
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        
+        # Rows come straight from the database; skip response model validation
+        return ORJSONResponse({
+            "documents": documents,
+            "total": total,
+            "offset": 0 if cursor else offset,
+            "limit": limit,
+            "next_cursor": next_cursor
+        })
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to list documents: {e}")
         raise HTTPException(
@@ -319,8 +451,8 @@ async def delete_document(
     try:
         workspace_id = current_user["workspace_id"]
         
-        # Initialize document processor
-        document_processor = DocumentProcessor(workspace_id)
+        # Get document processor
+        document_processor = get_document_processor(workspace_id)
         
         # Delete document
         success = await document_processor.delete_document(document_id, workspace_id)
@@ -360,46 +492,49 @@ async def get_document_chunks(
     try:
         workspace_id = current_user["workspace_id"]
         
-        # Verify document exists and belongs to user's workspace
         async with database_manager.get_session() as db:
-            doc_query = select(Document).where(
+            # Joining on the document scopes chunks to the user's workspace and
+            # COUNT(*) OVER () returns the total in the same round-trip
+            chunks_query = select(
+                *CHUNK_COLUMNS,
+                func.count().over().label("total")
+            ).join(
+                Document, Document.id == DocumentChunk.document_id
+            ).where(
                 Document.id == document_id,
                 Document.workspace_id == workspace_id
-            )
-            doc_result = await db.execute(doc_query)
-            document = doc_result.scalar_one_or_none()
-            
-            if not document:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Document not found"
-                )
-            
-            # Get chunks
-            chunks_query = select(DocumentChunk).where(
-                DocumentChunk.document_id == document_id
             ).offset(offset).limit(limit).order_by(DocumentChunk.chunk_index)
             
             chunks_result = await db.execute(chunks_query)
-            chunks = chunks_result.scalars().all()
+            rows = chunks_result.mappings().all()
             
-            # Get total count
-            count_query = select(func.count(DocumentChunk.id)).where(
-                DocumentChunk.document_id == document_id
-            )
-            count_result = await db.execute(count_query)
-            total = count_result.scalar() or 0
+            if rows:
+                total = rows[0]["total"]
+            else:
+                # Distinguish a missing document from an empty page
+                doc_query = select(Document.id).where(
+                    Document.id == document_id,
+                    Document.workspace_id == workspace_id
+                )
+                doc_result = await db.execute(doc_query)
+                if doc_result.scalar_one_or_none() is None:
+                    raise HTTPException(
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        detail="Document not found"
+                    )
+                
+                total = 0
+                if offset:
+                    count_query = select(func.count(DocumentChunk.id)).where(
+                        DocumentChunk.document_id == document_id
+                    )
+                    count_result = await db.execute(count_query)
+                    total = count_result.scalar() or 0
         
         return {
             "chunks": [
-                DocumentChunkResponse(
-                    id=chunk.id,
-                    chunk_index=chunk.chunk_index,
-                    page_number=chunk.page_number,
-                    char_count=chunk.char_count,
-                    token_count=chunk.token_count,
-                    vector_id=chunk.vector_id
-                ) for chunk in chunks
+                {column.key: row[column.key] for column in CHUNK_COLUMNS}
+                for row in rows
             ],
             "total": total,
             "offset": offset,
@@ -439,24 +574,10 @@ async def get_processing_status(
                 )
         
         # Calculate progress percentage based on status
-        progress_map = {
-            "pending": 0,
-            "processing": 50,
-            "completed": 100,
-            "failed": 30  # Failed partway through
-        }
-        
-        progress_percentage = progress_map.get(document.processing_status, 0)
+        progress_percentage = PROCESSING_PROGRESS.get(document.processing_status, 0)
         
         # Determine current stage
-        stage_map = {
-            "pending": "queued",
-            "processing": "pdf_extraction",
-            "completed": "completed",
-            "failed": "pdf_extraction"
-        }
-        
-        current_stage = stage_map.get(document.processing_status, "unknown")
+        current_stage = PROCESSING_STAGES.get(document.processing_status, "unknown")
         
         response_data = {
             "document_id": document.id,
@@ -501,48 +622,32 @@ async def search_documents(
             )
         
         # Import vector service here to avoid circular imports
-        from ..services.vector_service import VectorStoreManager
-        
-        # Initialize vector store manager
-        vector_manager = VectorStoreManager(workspace_id)
-        
-        # Perform search
-        search_results = await vector_manager.search(q.strip(), top_k=limit)
-        
-        # Group results by document
-        documents_map = {}
-        
-        for result in search_results:
-            doc_id = result.get("document_id")
-            if doc_id not in documents_map:
-                documents_map[doc_id] = {
-                    "document_id": doc_id,
-                    "filename": result.get("filename", f"Document {doc_id}"),
-                    "relevance_score": result.get("similarity", 0.0),
-                    "matched_chunks": []
-                }
-            
-            # Add matched chunk
-            documents_map[doc_id]["matched_chunks"].append({
-                "chunk_id": result.get("chunk_id"),
-                "text": result.get("text", "")[:200] + "..." if len(result.get("text", "")) > 200 else result.get("text", ""),
-                "page_number": result.get("page_number"),
-                "similarity": result.get("similarity", 0.0)
-            })
-            
-            # Update document relevance score (use highest scoring chunk)
-            documents_map[doc_id]["relevance_score"] = max(
-                documents_map[doc_id]["relevance_score"],
-                result.get("similarity", 0.0)
-            )
+        from ..services.vector_service import vector_store, make_text_preview
         
-        # Sort documents by relevance
-        documents = sorted(
-            documents_map.values(),
-            key=lambda x: x["relevance_score"],
-            reverse=True
+        # Perform search with hits grouped per document, best match first
+        groups = await vector_store.search_grouped(
+            str(workspace_id), q.strip(), k=limit, group_by="document_id"
         )
         
+        documents = [
+            {
+                "document_id": group["group"],
+                "filename": group["chunks"][0].get("filename", f"Document {group['group']}"),
+                "relevance_score": group["max_similarity"],
+                "matched_chunks": [
+                    {
+                        "chunk_id": chunk.get("chunk_index"),
+                        # Preview is stored at index time; older workspaces may lack it
+                        "text": chunk.get("text_preview") or make_text_preview(chunk.get("text", "")),
+                        "page_number": chunk.get("page"),
+                        "similarity": chunk["similarity"]
+                    }
+                    for chunk in group["chunks"]
+                ]
+            }
+            for group in groups
+        ]
+        
         return SearchResponse(
             query=q,
             total_results=len(documents),
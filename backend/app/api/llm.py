@@ -1,43 +1,179 @@
 from fastapi import APIRouter, HTTPException, Depends, Request
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel, Field, validator
-from typing import Optional, Dict, Any
+from fastapi.responses import ORJSONResponse, Response
+from sse_starlette.sse import EventSourceResponse
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional, Dict, Any, AsyncIterator
 import asyncio
 import logging
+import orjson
+import time
 from datetime import datetime
 
-from app.api.auth import get_current_user_from_token
+from app.api.auth import get_current_user_from_token, verify_token_cached
+from app.auth.user_manager import user_manager
+from app.services.prompt_cache import ExactPromptCache, SemanticPromptCache, PROMPT_CACHE_MAX_TEMPERATURE
+from app.services.vector_service import vector_store
 
 logger = logging.getLogger(__name__)
 
 # Initialize router
-router = APIRouter(tags=["llm"])
+router = APIRouter(tags=["llm"], default_response_class=ORJSONResponse)
 
 # Import services (will be injected at startup)
 model_manager = None
+prompt_cache: Optional[SemanticPromptCache] = None
+exact_prompt_cache = ExactPromptCache()
+_warmup_task: Optional[asyncio.Task] = None
+
+# Minimal system prompt for direct chat. The prefix is identical for every
+# request, so llama.cpp can reuse its evaluated tokens from the previous call.
+SYSTEM_PREFIX = "You are Phi, a helpful AI assistant. Answer the user's question directly and concisely.\n\nUser: "
+SYSTEM_SUFFIX = "\nAssistant:"
+
+
+def create_system_prompt(user_message: str) -> str:
+    """Wrap a user message in the fixed system prompt"""
+    return SYSTEM_PREFIX + user_message + SYSTEM_SUFFIX
+
+
+# Fixed SSE frames, encoded once
+SSE_START_FRAME = b"event: start\ndata: {}\n\n"
+SSE_COMPLETE_FRAME = b"event: complete\ndata: {}\n\n"
+
+# Keepalive comment interval so idle proxies don't drop long generations
+SSE_PING_INTERVAL = 15  # seconds
+
+
+# Chunk frames wrap JSON-encoded text as {"t": chunk} so newlines in a token
+# cannot split the frame
+SSE_CHUNK_PREFIX = b'event: chunk\ndata: {"t":'
+SSE_CHUNK_SUFFIX = b"}\n\n"
+
+
+# Token coalescing for streamed responses
+STREAM_BATCH_SIZE = 16  # tokens per frame
+STREAM_BATCH_INTERVAL = 0.025  # seconds before a partial batch is flushed
+
+
+async def _coalesce_tokens(tokens: AsyncIterator[str]) -> AsyncIterator[str]:
+    """
+    Group streamed tokens into micro-batches
+    
+    The first token is emitted on its own so time-to-first-token is
+    unchanged. After that a batch is emitted once it holds STREAM_BATCH_SIZE
+    tokens or when a token arrives more than STREAM_BATCH_INTERVAL after the
+    previous flush.
+    """
+    loop = asyncio.get_running_loop()
+    buffer = []
+    last_flush = None
+    
+    async for token in tokens:
+        if not token:
+            continue
+        buffer.append(token)
+        now = loop.time()
+        if (
+            last_flush is None
+            or len(buffer) >= STREAM_BATCH_SIZE
+            or now - last_flush > STREAM_BATCH_INTERVAL
+        ):
+            yield "".join(buffer)
+            buffer.clear()
+            last_flush = now
+    
+    if buffer:
+        yield "".join(buffer)
+
+
+def _sse_error_frame(error: Exception) -> bytes:
+    """Build an SSE error frame with a JSON-escaped message"""
+    return b"".join((b'event: error\ndata: {"error":', orjson.dumps(str(error)), b"}\n\n"))
+
+
+# Static /info payload, encoded once around the dynamic model_loaded flag
+_INFO_PREFIX = orjson.dumps({
+    "model_type": "Phi-2",
+    "model_path": "/Users/singularity/local AI/models/phi-2-instruct-Q4_K_M.gguf",
+})[:-1] + b',"model_loaded":'
+_INFO_SUFFIX = b"," + orjson.dumps({
+    "capabilities": [
+        "Text generation",
+        "Conversational AI",
+        "Code assistance",
+        "Creative writing"
+    ],
+    "note": "Direct LLM access without RAG constraints"
+})[1:]
+
+# /health payload around the timestamp, with one suffix per component state
+_HEALTH_PREFIX = b'{"status":"healthy","service":"llm","timestamp":"'
+_HEALTH_SUFFIXES = {
+    (has_manager, loaded): b'","components":' + orjson.dumps({
+        "model_manager": has_manager,
+        "model_loaded": loaded
+    }) + b"}"
+    for has_manager in (False, True)
+    for loaded in (False, True)
+}
+
+
+async def _generate_sse_stream(
+    prompt: str,
+    max_tokens: int,
+    temperature: float,
+    batch: bool
+) -> AsyncIterator[bytes]:
+    """Generate SSE frames for a direct LLM response"""
+    try:
+        # Send start event
+        yield SSE_START_FRAME
+        
+        # Stream LLM response with minimal system prompt for quality
+        chunks = model_manager.generate_stream(
+            prompt=create_system_prompt(prompt),
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+        if batch:
+            chunks = _coalesce_tokens(chunks)
+        
+        # Locals keep global/attribute lookups out of the per-chunk loop
+        dumps = orjson.dumps
+        prefix, suffix = SSE_CHUNK_PREFIX, SSE_CHUNK_SUFFIX
+        async for chunk in chunks:
+            # Send chunk event, skipping empty tokens
+            if chunk:
+                yield b"".join((prefix, dumps(chunk), suffix))
+        
+        # Send completion event
+        yield SSE_COMPLETE_FRAME
+        
+    except Exception as e:
+        logger.exception("Streaming error")
+        # Send error event and close stream
+        yield _sse_error_frame(e)
 
 
 # Pydantic models for request/response
 class LLMRequest(BaseModel):
     """Request model for direct LLM generation"""
+    model_config = ConfigDict(str_strip_whitespace=True, extra='forbid', frozen=True)
+    
     prompt: str = Field(..., min_length=1, max_length=5000, description="Prompt for LLM")
     max_tokens: Optional[int] = Field(1024, ge=1, le=2048, description="Maximum response tokens")
     temperature: Optional[float] = Field(0.7, ge=0.0, le=2.0, description="Generation temperature")
-    
-    @validator('prompt')
-    def prompt_must_not_be_empty(cls, v):
-        if not v or not v.strip():
-            raise ValueError('Prompt cannot be empty or whitespace only')
-        return v.strip()
 
 
 class StreamingLLMRequest(LLMRequest):
     """Request model for streaming LLM generation"""
-    pass
+    batch: bool = Field(True, description="Coalesce tokens into micro-batched chunk events")
 
 
 class LLMResponse(BaseModel):
     """Response model for LLM generation"""
+    model_config = ConfigDict(frozen=True)
+    
     response: str = Field(..., description="Generated response")
     prompt: str = Field(..., description="Original prompt")
     response_time_ms: int = Field(..., description="Response time in milliseconds")
@@ -46,11 +182,11 @@ class LLMResponse(BaseModel):
 
 # API Endpoints
 
-@router.post("/chat", response_model=LLMResponse)
+@router.post("/chat", responses={200: {"model": LLMResponse}})
 async def direct_llm_chat(
     request: LLMRequest,
     current_user: dict = Depends(get_current_user_from_token)
-) -> LLMResponse:
+) -> ORJSONResponse:
     """
     Direct LLM chat without RAG pipeline
     
@@ -58,25 +194,48 @@ async def direct_llm_chat(
     any document search, context injection, or guardrails.
     """
     try:
-        start_time = datetime.now()
+        start_ns = time.perf_counter_ns()
+        
+        formatted_prompt = create_system_prompt(request.prompt)
         
-        # Generate response with minimal system prompt for quality
-        formatted_prompt = f"You are Phi, a helpful AI assistant. Answer the user's question directly and concisely.\n\nUser: {request.prompt}\nAssistant:"
-        response = await model_manager.generate(
-            prompt=formatted_prompt,
-            max_tokens=request.max_tokens,
-            temperature=request.temperature
+        # Reuse the response to an identical or semantically equivalent earlier prompt
+        exact_key = exact_prompt_cache.make_key(formatted_prompt, request.max_tokens, request.temperature)
+        cached = exact_prompt_cache.get(exact_key)
+        # Semantic matches are scoped to the caller, and sampled generations
+        # are never reused
+        cache_params = (
+            current_user["user_id"],
+            current_user["workspace_id"],
+            request.max_tokens,
+            request.temperature
         )
+        use_prompt_cache = prompt_cache is not None and request.temperature <= PROMPT_CACHE_MAX_TEMPERATURE
+        embedding = None
+        if cached is None and use_prompt_cache:
+            embedding = await prompt_cache.embed(request.prompt)
+            cached = prompt_cache.lookup(embedding, cache_params)
         
-        end_time = datetime.now()
-        response_time_ms = int((end_time - start_time).total_seconds() * 1000)
+        if cached is not None:
+            response, tokens_generated = cached
+        else:
+            # Generate response with minimal system prompt for quality
+            response, tokens_generated = await model_manager.generate_with_usage(
+                prompt=formatted_prompt,
+                max_tokens=request.max_tokens,
+                temperature=request.temperature
+            )
+            exact_prompt_cache.set(exact_key, (response, tokens_generated))
+            if use_prompt_cache:
+                prompt_cache.add(embedding, cache_params, (response, tokens_generated))
         
-        return LLMResponse(
-            response=response,
-            prompt=request.prompt,
-            response_time_ms=response_time_ms,
-            tokens_generated=None  # Could implement token counting later
-        )
+        response_time_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
+        
+        return ORJSONResponse({
+            "response": response,
+            "prompt": request.prompt,
+            "response_time_ms": response_time_ms,
+            "tokens_generated": tokens_generated
+        })
         
     except Exception as e:
         logger.error(f"Direct LLM generation failed for prompt '{request.prompt[:50]}...': {e}")
@@ -92,8 +251,9 @@ async def stream_llm_get(
     max_tokens: int = 1024,
     temperature: float = 0.7,
     token: Optional[str] = None,
+    batch: bool = True,
     request: Request = None
-) -> StreamingResponse:
+) -> EventSourceResponse:
     """
     Stream LLM response using Server-Sent Events (GET method for EventSource)
     
@@ -112,10 +272,7 @@ async def stream_llm_get(
         # Handle authentication for EventSource (token in query params)
         if token:
             try:
-                from app.auth.auth_service import auth_service
-                from app.auth.user_manager import user_manager
-                
-                payload = auth_service.verify_token(token)
+                payload = await verify_token_cached(token)
                 current_user = user_manager.get_current_user()
                 
                 if not current_user or current_user.get("user_id") != payload.get("user_id"):
@@ -135,40 +292,15 @@ async def stream_llm_get(
                 detail="Authentication required - provide token parameter for streaming"
             )
         
-        # Create streaming generator
-        async def generate_stream():
-            try:
-                # Send start event
-                yield f"event: start\ndata: {{}}\n\n"
-                
-                # Stream LLM response with minimal system prompt for quality  
-                formatted_prompt = f"You are Phi, a helpful AI assistant. Answer the user's question directly and concisely.\n\nUser: {prompt.strip()}\nAssistant:"
-                async for chunk in model_manager.generate_stream(
-                    prompt=formatted_prompt,
-                    max_tokens=max_tokens,
-                    temperature=temperature
-                ):
-                    # Send chunk event
-                    yield f"event: chunk\ndata: {chunk}\n\n"
-                
-                # Send completion event
-                yield f"event: complete\ndata: {{}}\n\n"
-                
-            except Exception as e:
-                logger.error(f"Streaming error: {e}")
-                # Send error event and close stream
-                yield f"event: error\ndata: {{\"error\": \"{str(e)}\"}}\n\n"
-        
-        return StreamingResponse(
-            generate_stream(),
-            media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-                "Access-Control-Allow-Origin": "*"
-            }
+        # Frames are prebuilt bytes and pass through unchanged; the response
+        # adds keepalive pings and the no-cache/no-buffering headers
+        return EventSourceResponse(
+            _generate_sse_stream(prompt.strip(), max_tokens, temperature, batch),
+            ping=SSE_PING_INTERVAL
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to initialize LLM streaming: {e}")
         raise HTTPException(
@@ -181,7 +313,7 @@ async def stream_llm_get(
 async def stream_llm_post(
     request: StreamingLLMRequest,
     current_user: dict = Depends(get_current_user_from_token)
-) -> StreamingResponse:
+) -> EventSourceResponse:
     """
     Stream LLM response using Server-Sent Events (POST method)
     
@@ -189,38 +321,11 @@ async def stream_llm_post(
     sending the prompt directly to Phi-2 without any RAG processing.
     """
     try:
-        # Create streaming generator
-        async def generate_stream():
-            try:
-                # Send start event
-                yield f"event: start\ndata: {{}}\n\n"
-                
-                # Stream LLM response with minimal system prompt for quality
-                formatted_prompt = f"You are Phi, a helpful AI assistant. Answer the user's question directly and concisely.\n\nUser: {request.prompt}\nAssistant:"
-                async for chunk in model_manager.generate_stream(
-                    prompt=formatted_prompt,
-                    max_tokens=request.max_tokens,
-                    temperature=request.temperature
-                ):
-                    # Send chunk event
-                    yield f"event: chunk\ndata: {chunk}\n\n"
-                
-                # Send completion event
-                yield f"event: complete\ndata: {{}}\n\n"
-                
-            except Exception as e:
-                logger.error(f"Streaming error: {e}")
-                # Send error event and close stream
-                yield f"event: error\ndata: {{\"error\": \"{str(e)}\"}}\n\n"
-        
-        return StreamingResponse(
-            generate_stream(),
-            media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-                "Access-Control-Allow-Origin": "*"
-            }
+        # Frames are prebuilt bytes and pass through unchanged; the response
+        # adds keepalive pings and the no-cache/no-buffering headers
+        return EventSourceResponse(
+            _generate_sse_stream(request.prompt, request.max_tokens, request.temperature, request.batch),
+            ping=SSE_PING_INTERVAL
         )
         
     except Exception as e:
@@ -236,15 +341,16 @@ async def stream_llm_post(
 @router.get("/health")
 async def health_check():
     """Health check endpoint for LLM service"""
-    return {
-        "status": "healthy",
-        "service": "llm",
-        "timestamp": datetime.utcnow().isoformat(),
-        "components": {
-            "model_manager": model_manager is not None,
-            "model_loaded": model_manager.is_loaded() if model_manager else False
-        }
-    }
+    has_manager = model_manager is not None
+    loaded = has_manager and bool(model_manager.is_loaded())
+    return Response(
+        content=(
+            _HEALTH_PREFIX
+            + datetime.utcnow().isoformat().encode()
+            + _HEALTH_SUFFIXES[has_manager, loaded]
+        ),
+        media_type="application/json"
+    )
 
 
 @router.get("/info")
@@ -252,31 +358,46 @@ async def llm_info(
     current_user: dict = Depends(get_current_user_from_token)
 ):
     """Get LLM model information"""
+    model_loaded = model_manager.is_loaded() if model_manager else False
+    return Response(
+        content=_INFO_PREFIX + (b"true" if model_loaded else b"false") + _INFO_SUFFIX,
+        media_type="application/json"
+    )
+
+
+# Service initialization function
+async def _warm_up_model(model_mgr) -> None:
+    """
+    Run a one-token generation so the first request doesn't pay cold-start cost
+    
+    Uses the direct-chat system prompt so its prefix is already evaluated
+    when the first real request arrives.
+    """
+    if not model_mgr.is_loaded():
+        return
     try:
-        return {
-            "model_type": "Phi-2",
-            "model_path": "/Users/singularity/local AI/models/phi-2-instruct-Q4_K_M.gguf",
-            "model_loaded": model_manager.is_loaded() if model_manager else False,
-            "capabilities": [
-                "Text generation",
-                "Conversational AI", 
-                "Code assistance",
-                "Creative writing"
-            ],
-            "note": "Direct LLM access without RAG constraints"
-        }
-        
-    except Exception as e:
-        logger.error(f"Failed to get LLM info: {e}")
-        raise HTTPException(
-            status_code=500,
-            detail="Failed to retrieve LLM information"
+        start_ns = time.perf_counter_ns()
+        await model_mgr.generate(
+            prompt=create_system_prompt("Hi"),
+            max_tokens=1,
+            temperature=0.0
         )
+        logger.info(f"LLM warmup completed in {(time.perf_counter_ns() - start_ns) // 1_000_000}ms")
+    except Exception as e:
+        logger.warning(f"LLM warmup failed: {e}")
 
 
-# Service initialization function
 def initialize_llm_router(model_mgr):
     """Initialize the LLM router with service dependencies"""
-    global model_manager
+    global model_manager, prompt_cache, _warmup_task
     model_manager = model_mgr
-    logger.info("LLM router initialized with model manager")
\ No newline at end of file
+    prompt_cache = SemanticPromptCache(vector_store.embed_texts)
+    logger.info("LLM router initialized with model manager")
+    
+    # Warm the model in the background when called from the running app
+    if model_mgr is not None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        _warmup_task = loop.create_task(_warm_up_model(model_mgr))
\ No newline at end of file
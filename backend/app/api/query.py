@@ -1,39 +1,142 @@
 from fastapi import APIRouter, HTTPException, Depends, Request
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel, Field, validator
-from typing import Optional, List, Dict, Any
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field
+from typing import AsyncIterator, Optional, List, Dict, Any, Tuple
 import asyncio
 import logging
+from cachetools import TTLCache
+import os
+import time
 from datetime import datetime
 
-from app.api.auth import get_current_user_from_token
+from app.api.auth import get_current_user_from_token, verify_token_cached
+from app.auth.user_manager import user_manager
+from app.services.vector_service import vector_store, workspace_revision
+from app.services.prompt_cache import SemanticPromptCache
 from app.services.query_service import QueryError, NoResultsError
 from app.services.streaming_service import StreamingError
 
 logger = logging.getLogger(__name__)
 
 # Initialize router
-router = APIRouter(tags=["query"])
+router = APIRouter(tags=["query"], default_response_class=ORJSONResponse)
 
 # Import services (will be injected at startup)
 query_service = None
 streaming_service = None
 
+# Semantic cache of RAG answers (see initialize_query_router)
+QUERY_CACHE_MAX_SIZE = int(os.getenv("QUERY_CACHE_MAX_SIZE", "4096"))
+query_cache: Optional[SemanticPromptCache] = None
+
+# Workspace stats for dashboard polling, keyed by workspace and revision so
+# uploads and deletes show up immediately
+STATS_CACHE_TTL_SECONDS = float(os.getenv("STATS_CACHE_TTL_SECONDS", "5"))
+_stats_cache: TTLCache = TTLCache(maxsize=1024, ttl=STATS_CACHE_TTL_SECONDS)
+
+# In-flight RAG queries keyed by user and query parameters
+_inflight_queries: Dict[tuple, asyncio.Future] = {}
+
+
+async def _query_documents_coalesced(
+    workspace_id, user_id, request: "QueryRequest", query_embedding=None
+) -> Dict[str, Any]:
+    """
+    Run a RAG query, sharing the result with identical concurrent requests
+    
+    Retries and double-submits of the same query join the pending pipeline
+    run instead of queueing a second LLM generation behind it. The shared
+    task is shielded so one caller disconnecting doesn't cancel it for
+    the others. A query embedding computed for the query cache is reused
+    for the vector search.
+    """
+    key = (
+        workspace_id, user_id, request.query, request.top_k,
+        request.min_score, request.max_tokens, request.temperature
+    )
+    task = _inflight_queries.get(key)
+    if task is None:
+        task = asyncio.ensure_future(query_service.query_documents(
+            workspace_id=workspace_id,
+            query=request.query,
+            user_id=user_id,
+            top_k=request.top_k,
+            min_score=request.min_score,
+            max_tokens=request.max_tokens,
+            temperature=request.temperature,
+            query_embedding=query_embedding
+        ))
+        _inflight_queries[key] = task
+        
+        def forget(done: asyncio.Future) -> None:
+            _inflight_queries.pop(key, None)
+            # Mark the error retrieved in case every caller went away
+            if not done.cancelled():
+                done.exception()
+        
+        task.add_done_callback(forget)
+    return await asyncio.shield(task)
+
+
+def _extract_ids(current_user) -> Tuple[Any, Any]:
+    """Return (user_id, workspace_id) from a user dict or user object"""
+    if type(current_user) is dict:
+        return current_user.get("user_id"), current_user.get("workspace_id")
+    return getattr(current_user, "user_id", None), getattr(current_user, "workspace_id", None)
+
+
+# Pending SSE frames buffered between the query pipeline and the socket
+SSE_QUEUE_MAX_SIZE = 64
+
+
+async def _sse_byte_stream(events: AsyncIterator[str], error_log: str) -> AsyncIterator[bytes]:
+    """
+    Relay SSE messages to the client as pre-encoded bytes
+    
+    A producer task drains the streaming service into a bounded queue, so
+    generation keeps running while the previous chunk is being written and
+    pauses once SSE_QUEUE_MAX_SIZE frames are waiting on a slow client.
+    Errors end the stream with an error event.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=SSE_QUEUE_MAX_SIZE)
+    
+    async def produce() -> None:
+        try:
+            async for message in events:
+                await queue.put(message.encode())
+        except Exception as e:
+            logger.exception(error_log)
+            await queue.put(streaming_service._format_sse_message(
+                {"error": str(e)},
+                event_type="error"
+            ).encode())
+        finally:
+            # Runs generator cleanup (e.g. stopping the LLM) right away
+            await events.aclose()
+        await queue.put(None)
+    
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            frame = await queue.get()
+            if frame is None:
+                break
+            yield frame
+    finally:
+        # Client went away; stop generating for it
+        producer.cancel()
+
 
 # Pydantic models for request/response
 class QueryRequest(BaseModel):
     """Request model for document queries"""
+    model_config = ConfigDict(str_strip_whitespace=True, extra='forbid', frozen=True)
+    
     query: str = Field(..., min_length=1, max_length=1000, description="Search query")
     top_k: Optional[int] = Field(5, ge=1, le=50, description="Number of results to return")
     min_score: Optional[float] = Field(0.5, ge=0.0, le=1.0, description="Minimum similarity score")
     max_tokens: Optional[int] = Field(None, ge=1, le=2048, description="Maximum response tokens")
     temperature: Optional[float] = Field(None, ge=0.0, le=2.0, description="Generation temperature")
-    
-    @validator('query')
-    def query_must_not_be_empty(cls, v):
-        if not v or not v.strip():
-            raise ValueError('Query cannot be empty or whitespace only')
-        return v.strip()
 
 
 class StreamingQueryRequest(QueryRequest):
@@ -43,15 +146,11 @@ class StreamingQueryRequest(QueryRequest):
 
 class SearchRequest(BaseModel):
     """Request model for document search (without LLM)"""
+    model_config = ConfigDict(str_strip_whitespace=True, extra='forbid', frozen=True)
+    
     query: str = Field(..., min_length=1, max_length=1000, description="Search query")
     top_k: Optional[int] = Field(5, ge=1, le=50, description="Number of results to return")
     min_score: Optional[float] = Field(0.5, ge=0.0, le=1.0, description="Minimum similarity score")
-    
-    @validator('query')
-    def query_must_not_be_empty(cls, v):
-        if not v or not v.strip():
-            raise ValueError('Query cannot be empty or whitespace only')
-        return v.strip()
 
 
 class QueryResponse(BaseModel):
@@ -87,8 +186,11 @@ class StatsResponse(BaseModel):
 
 
 # API Endpoints
+# Handlers build their response models from trusted service output, so
+# response_model=None skips FastAPI's second validation pass; the models
+# stay in the OpenAPI schema through `responses`.
 
-@router.post("/documents", response_model=QueryResponse)
+@router.post("/documents", response_model=None, responses={200: {"model": QueryResponse}})
 async def query_documents(
     request: QueryRequest,
     current_user: dict = Depends(get_current_user_from_token)
@@ -100,22 +202,38 @@ async def query_documents(
     and generates a response using the retrieved context.
     """
     try:
+        start_time = time.perf_counter_ns()
+        
         # Extract user info
-        user_id = current_user.get("user_id") if isinstance(current_user, dict) else getattr(current_user, "user_id", None)
-        workspace_id = current_user.get("workspace_id") if isinstance(current_user, dict) else getattr(current_user, "workspace_id", None)
+        user_id, workspace_id = _extract_ids(current_user)
         
-        # Execute query
-        result = await query_service.query_documents(
-            workspace_id=workspace_id,
-            query=request.query,
-            user_id=user_id,
-            top_k=request.top_k,
-            min_score=request.min_score,
-            max_tokens=request.max_tokens,
-            temperature=request.temperature
+        # Answer paraphrases of a recent query from the cache. The workspace
+        # revision in the key retires entries once documents change.
+        cache_params = (
+            workspace_id, user_id, workspace_revision(workspace_id),
+            request.top_k, request.min_score, request.max_tokens, request.temperature
         )
+        embedding = None
+        if query_cache is not None:
+            embedding = await query_cache.embed(request.query)
+            cached = query_cache.lookup(embedding, cache_params)
+            if cached is not None:
+                response_time_ms = (time.perf_counter_ns() - start_time) // 1_000_000
+                return QueryResponse.model_construct(**{
+                    **cached,
+                    "query": request.query,
+                    "response_time_ms": response_time_ms
+                })
         
-        return QueryResponse(**result)
+        # Execute query
+        result = await _query_documents_coalesced(workspace_id, user_id, request, embedding)
+        
+        # Service output is trusted and already shaped; skip re-validation
+        if not isinstance(result, dict):
+            raise QueryError(f"Unexpected query result type: {type(result).__name__}")
+        if query_cache is not None:
+            query_cache.add(embedding, cache_params, result)
+        return QueryResponse.model_construct(**result)
         
     except NoResultsError as e:
         logger.warning(f"No results found for query '{request.query}': {e}")
@@ -143,9 +261,20 @@ async def query_documents(
         )
 
 
+def _nonempty_query(query: str) -> str:
+    """Reject blank streaming queries before any token verification"""
+    query = query.strip()
+    if not query:
+        raise HTTPException(
+            status_code=400,
+            detail="Query parameter is required and cannot be empty"
+        )
+    return query
+
+
 @router.get("/stream")
 async def stream_query_get(
-    query: str,
+    query: str = Depends(_nonempty_query),
     top_k: int = 5,
     min_score: float = 0.5,
     max_tokens: Optional[int] = None,
@@ -161,22 +290,11 @@ async def stream_query_get(
     allowing EventSource clients to receive partial results as they're generated.
     """
     try:
-        # Validate query and ensure it's a string
-        query = str(query) if query is not None else ""
-        if not query or not query.strip():
-            raise HTTPException(
-                status_code=400,
-                detail="Query parameter is required and cannot be empty"
-            )
-        
         # Handle authentication for EventSource (token in query params)
         if token:
-            # Verify JWT token directly
+            # Verify JWT token, reusing recent verifications on reconnect
             try:
-                from app.auth.auth_service import auth_service
-                from app.auth.user_manager import user_manager
-                
-                payload = auth_service.verify_token(token)
+                payload = await verify_token_cached(token)
                 current_user = user_manager.get_current_user()
                 
                 if not current_user or current_user.get("user_id") != payload.get("user_id"):
@@ -197,34 +315,22 @@ async def stream_query_get(
             )
         
         # Extract user info
-        user_id = current_user.get("user_id") if isinstance(current_user, dict) else getattr(current_user, "user_id", None)
-        workspace_id = current_user.get("workspace_id") if isinstance(current_user, dict) else getattr(current_user, "workspace_id", None)
+        user_id, workspace_id = _extract_ids(current_user)
         
         # Create streaming generator
-        async def generate_stream():
-            try:
-                async for chunk in streaming_service.stream_query_response(
-                    workspace_id=workspace_id,
-                    query=query.strip(),
-                    user_id=user_id,
-                    top_k=top_k,
-                    min_score=min_score,
-                    max_tokens=max_tokens,
-                    temperature=temperature,
-                    include_progress=include_progress
-                ):
-                    yield chunk
-            except Exception as e:
-                logger.error(f"Streaming error: {e}")
-                # Send error event and close stream
-                error_message = streaming_service._format_sse_message(
-                    {"error": str(e)},
-                    event_type="error"
-                )
-                yield error_message
+        events = streaming_service.stream_query_response(
+            workspace_id=workspace_id,
+            query=query,
+            user_id=user_id,
+            top_k=top_k,
+            min_score=min_score,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            include_progress=include_progress
+        )
         
         return StreamingResponse(
-            generate_stream(),
+            _sse_byte_stream(events, "Streaming error"),
             media_type="text/event-stream",
             headers={
                 "Cache-Control": "no-cache",
@@ -233,6 +339,8 @@ async def stream_query_get(
             }
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to initialize streaming: {e}")
         raise HTTPException(
@@ -254,34 +362,22 @@ async def stream_query_post(
     """
     try:
         # Extract user info
-        user_id = current_user.get("user_id") if isinstance(current_user, dict) else getattr(current_user, "user_id", None)
-        workspace_id = current_user.get("workspace_id") if isinstance(current_user, dict) else getattr(current_user, "workspace_id", None)
+        user_id, workspace_id = _extract_ids(current_user)
         
         # Create streaming generator
-        async def generate_stream():
-            try:
-                async for chunk in streaming_service.stream_query_response(
-                    workspace_id=workspace_id,
-                    query=request.query,
-                    user_id=user_id,
-                    top_k=request.top_k,
-                    min_score=request.min_score,
-                    max_tokens=request.max_tokens,
-                    temperature=request.temperature,
-                    include_progress=request.include_progress
-                ):
-                    yield chunk
-            except Exception as e:
-                logger.error(f"Streaming error: {e}")
-                # Send error event and close stream
-                error_message = streaming_service._format_sse_message(
-                    {"error": str(e)},
-                    event_type="error"
-                )
-                yield error_message
+        events = streaming_service.stream_query_response(
+            workspace_id=workspace_id,
+            query=request.query,
+            user_id=user_id,
+            top_k=request.top_k,
+            min_score=request.min_score,
+            max_tokens=request.max_tokens,
+            temperature=request.temperature,
+            include_progress=request.include_progress
+        )
         
         return StreamingResponse(
-            generate_stream(),
+            _sse_byte_stream(events, "Streaming error"),
             media_type="text/event-stream",
             headers={
                 "Cache-Control": "no-cache",
@@ -298,7 +394,7 @@ async def stream_query_post(
         )
 
 
-@router.post("/search", response_model=SearchResponse)
+@router.post("/search", response_model=None, responses={200: {"model": SearchResponse}})
 async def search_documents(
     request: SearchRequest,
     current_user: dict = Depends(get_current_user_from_token)
@@ -311,8 +407,7 @@ async def search_documents(
     """
     try:
         # Extract user info
-        user_id = current_user.get("user_id") if isinstance(current_user, dict) else getattr(current_user, "user_id", None)
-        workspace_id = current_user.get("workspace_id") if isinstance(current_user, dict) else getattr(current_user, "workspace_id", None)
+        user_id, workspace_id = _extract_ids(current_user)
         
         # Execute search
         results = await query_service.search_similar_documents(
@@ -322,7 +417,7 @@ async def search_documents(
             min_score=request.min_score
         )
         
-        return SearchResponse(
+        return SearchResponse.model_construct(
             results=results,
             query=request.query,
             total_results=len(results)
@@ -342,7 +437,7 @@ async def search_documents(
         )
 
 
-@router.get("/history", response_model=QueryHistoryResponse)
+@router.get("/history", response_model=None, responses={200: {"model": QueryHistoryResponse}})
 async def get_query_history(
     limit: int = 50,
     offset: int = 0,
@@ -355,8 +450,7 @@ async def get_query_history(
     """
     try:
         # Extract user info
-        user_id = current_user.get("user_id") if isinstance(current_user, dict) else getattr(current_user, "user_id", None)
-        workspace_id = current_user.get("workspace_id") if isinstance(current_user, dict) else getattr(current_user, "workspace_id", None)
+        user_id, workspace_id = _extract_ids(current_user)
         
         # Validate pagination parameters
         if limit < 1 or limit > 100:
@@ -365,17 +459,14 @@ async def get_query_history(
             offset = 0
         
         # Get query history
-        history = await query_service.get_query_history(
+        history, total = await query_service.get_query_history(
             user_id=user_id,
             workspace_id=workspace_id,
             limit=limit,
             offset=offset
         )
         
-        return QueryHistoryResponse(
-            history=history,
-            total=len(history)  # TODO: Get actual total from database
-        )
+        return QueryHistoryResponse.model_construct(history=history, total=total)
         
     except Exception as e:
         logger.error(f"Failed to get query history: {e}")
@@ -385,7 +476,7 @@ async def get_query_history(
         )
 
 
-@router.get("/stats", response_model=StatsResponse)
+@router.get("/stats", response_model=None, responses={200: {"model": StatsResponse}})
 async def get_search_stats(
     current_user: dict = Depends(get_current_user_from_token)
 ) -> StatsResponse:
@@ -400,9 +491,14 @@ async def get_search_stats(
         workspace_id = current_user["workspace_id"]
         
         # Get workspace stats
-        stats = query_service.get_workspace_search_stats(workspace_id)
-        
-        return StatsResponse(**stats)
+        cache_key = (workspace_id, workspace_revision(workspace_id))
+        stats = _stats_cache.get(cache_key)
+        if stats is None:
+            stats = await query_service.get_workspace_search_stats(workspace_id)
+            if not isinstance(stats, dict):
+                raise QueryError(f"Unexpected stats result type: {type(stats).__name__}")
+            _stats_cache[cache_key] = stats
+        return StatsResponse.model_construct(**stats)
         
     except Exception as e:
         logger.error(f"Failed to get search stats: {e}")
@@ -425,31 +521,19 @@ async def stream_search(
     """
     try:
         # Extract user info
-        user_id = current_user.get("user_id") if isinstance(current_user, dict) else getattr(current_user, "user_id", None)
-        workspace_id = current_user.get("workspace_id") if isinstance(current_user, dict) else getattr(current_user, "workspace_id", None)
+        user_id, workspace_id = _extract_ids(current_user)
         
         # Create streaming generator
-        async def generate_search_stream():
-            try:
-                async for chunk in streaming_service.stream_search_results(
-                    workspace_id=workspace_id,
-                    query=request.query,
-                    user_id=user_id,
-                    top_k=request.top_k,
-                    min_score=request.min_score
-                ):
-                    yield chunk
-            except Exception as e:
-                logger.error(f"Search streaming error: {e}")
-                # Send error event
-                error_message = streaming_service._format_sse_message(
-                    {"error": str(e)},
-                    event_type="error"
-                )
-                yield error_message
+        events = streaming_service.stream_search_results(
+            workspace_id=workspace_id,
+            query=request.query,
+            user_id=user_id,
+            top_k=request.top_k,
+            min_score=request.min_score
+        )
         
         return StreamingResponse(
-            generate_search_stream(),
+            _sse_byte_stream(events, "Search streaming error"),
             media_type="text/event-stream",
             headers={
                 "Cache-Control": "no-cache",
@@ -468,24 +552,37 @@ async def stream_search(
 
 # Utility endpoints
 
+# /health timestamp, reformatted at most once per second for frequent probes
+_health_timestamp = (0, "")
+
+
+def _health_timestamp_now() -> str:
+    global _health_timestamp
+    second = int(time.time())
+    if second != _health_timestamp[0]:
+        _health_timestamp = (second, datetime.utcfromtimestamp(second).isoformat())
+    return _health_timestamp[1]
+
+
 @router.get("/health")
 async def health_check():
     """Health check endpoint for query service"""
-    return {
+    return ORJSONResponse({
         "status": "healthy",
         "service": "query",
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": _health_timestamp_now(),
         "components": {
             "query_service": query_service is not None,
             "streaming_service": streaming_service is not None
         }
-    }
+    })
 
 
 # Service initialization function
 def initialize_query_router(query_svc, streaming_svc):
     """Initialize the query router with service dependencies"""
-    global query_service, streaming_service
+    global query_service, streaming_service, query_cache
     query_service = query_svc
     streaming_service = streaming_svc
+    query_cache = SemanticPromptCache(vector_store.embed_texts, max_size=QUERY_CACHE_MAX_SIZE)
     logger.info("Query router initialized with services")
\ No newline at end of file
@@ -1,14 +1,33 @@
 import os
+import asyncio
 import logging
+import time
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
 import bcrypt
-from jose import JWTError, jwt
+from jose import JWTError, jwk, jwt
 
 from .database_service import database_service
 
 logger = logging.getLogger(__name__)
 
+# bcrypt work factor for new hashes; stored hashes with a lower cost are
+# re-hashed on the next successful login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "10"))
+
+# SQL used on the auth hot paths. The auth connection is long-lived, so
+# sqlite3's per-connection statement cache compiles each of these once and
+# reuses the prepared statement; keep them as shared constants so every
+# call passes the identical SQL text.
+_SQL_REGISTER_USER = """INSERT INTO users (username, password_hash, workspace_id, is_active, created_at, updated_at)
+   SELECT ?, ?, CAST((SELECT last_id + 1 FROM workspace_id_seq) AS TEXT), ?, ?, ?
+   WHERE NOT EXISTS (SELECT 1 FROM users WHERE username = ?)
+   RETURNING id, workspace_id"""
+_SQL_LOGIN_USER = "SELECT id, username, password_hash, workspace_id, is_active FROM users WHERE username = ?"
+_SQL_STAMP_LOGIN = "UPDATE users SET updated_at = ? WHERE id = ?"
+_SQL_USER_BY_ID = "SELECT id, username, workspace_id, is_active, created_at, updated_at FROM users WHERE id = ?"
+_SQL_REHASH_USER = "UPDATE users SET password_hash = ?, updated_at = ? WHERE id = ?"
+
 # Custom exceptions
 class AuthError(Exception):
     """Base authentication error"""
@@ -21,9 +40,15 @@ class UserAlreadyExistsError(AuthError):
 class AuthService:
     """Authentication service with encryption and JWT support"""
     
+    # Claims every access token must carry
+    REQUIRED_CLAIMS = ("user_id", "username", "workspace_id")
+    
     def __init__(self):
         self.secret_key = os.getenv("JWT_SECRET_KEY", "your-super-secret-jwt-key-change-in-production")
         self.algorithm = "HS256"
+        # Build the HMAC key once; python-jose re-parses a str secret on
+        # every encode/decode otherwise
+        self._signing_key = jwk.construct(self.secret_key, self.algorithm)
         self.access_token_expire_minutes = 60 * 24  # 24 hours
         
     
@@ -46,27 +71,23 @@ class AuthService:
             # Validate input
             self._validate_password_strength(password)
             
-            # Check for existing username
-            existing_user = database_service.execute_query(
-                "SELECT id FROM users WHERE username = ?", (username,)
-            )
-            if existing_user:
-                raise UserAlreadyExistsError("Username already exists")
-            
             # Hash password
-            salt = bcrypt.gensalt()
-            hashed_password = bcrypt.hashpw(password.encode('utf-8'), salt)
-            
-            # Get next available workspace
-            workspace_id = database_service.get_next_workspace_id()
+            salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
+            hashed_password = await asyncio.to_thread(bcrypt.hashpw, password.encode('utf-8'), salt)
             
-            # Create new user
-            user_id = database_service.execute_insert(
-                """INSERT INTO users (username, password_hash, workspace_id, is_active, created_at, updated_at)
-                   VALUES (?, ?, ?, ?, ?, ?)""",
-                (username, hashed_password.decode('utf-8'), str(workspace_id), True, 
-                 datetime.utcnow().isoformat(), datetime.utcnow().isoformat())
+            # Create new user in the next available workspace. The username
+            # check, workspace allocation and insert run as one statement, so
+            # concurrent registrations can't claim the same workspace.
+            now = datetime.utcnow().isoformat()
+            created = await database_service.execute_returning(
+                _SQL_REGISTER_USER,
+                (username, hashed_password.decode('utf-8'), True, now, now, username)
             )
+            if not created:
+                raise UserAlreadyExistsError("Username already exists")
+            
+            user_id = created['id']
+            workspace_id = int(created['workspace_id'])
             
             logger.info(f"User registered successfully: {username} (workspace: {workspace_id})")
             
@@ -97,11 +118,8 @@ class AuthService:
             AuthError: If authentication fails
         """
         try:
-            # Find user by username
-            user = database_service.execute_query(
-                "SELECT id, username, password_hash, workspace_id, is_active FROM users WHERE username = ?",
-                (username,)
-            )
+            # Find user
+            user = await database_service.execute_query(_SQL_LOGIN_USER, (username,))
             
             if not user:
                 raise AuthError("Invalid credentials")
@@ -110,15 +128,29 @@ class AuthService:
             if not user['is_active']:
                 raise AuthError("User account is disabled")
             
-            # Verify password
-            if not bcrypt.checkpw(password.encode('utf-8'), user['password_hash'].encode('utf-8')):
+            # Verify password off the event loop; bcrypt is CPU-bound
+            password_bytes = password.encode('utf-8')
+            if not await asyncio.to_thread(bcrypt.checkpw, password_bytes, user['password_hash'].encode('utf-8')):
                 raise AuthError("Invalid credentials")
             
-            # Update last login
-            database_service.execute_update(
-                "UPDATE users SET updated_at = ? WHERE id = ?",
-                (datetime.utcnow().isoformat(), user['id'])
-            )
+            # Stamp the successful login. Weaker hashes are upgraded to the
+            # current work factor in the same write; stronger ones are kept
+            # so lowering BCRYPT_ROUNDS never downgrades a hash
+            logged_in_at = datetime.utcnow().isoformat()
+            rounds = self._bcrypt_rounds(user['password_hash'])
+            if rounds is not None and rounds < BCRYPT_ROUNDS:
+                new_hash = await asyncio.to_thread(
+                    bcrypt.hashpw, password_bytes, bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
+                )
+                await database_service.execute_update(
+                    _SQL_REHASH_USER,
+                    (new_hash.decode('utf-8'), logged_in_at, user['id'])
+                )
+            else:
+                await database_service.execute_update(
+                    _SQL_STAMP_LOGIN,
+                    (logged_in_at, user['id'])
+                )
             
             # Create access token
             token_data = {
@@ -157,17 +189,18 @@ class AuthService:
         """
         to_encode = data.copy()
         
-        if expires_delta:
-            expire = datetime.utcnow() + expires_delta
-        else:
-            expire = datetime.utcnow() + timedelta(minutes=self.access_token_expire_minutes)
+        # NumericDate claims as plain ints; jose would otherwise convert
+        # each datetime through a UTC time tuple
+        issued_at = int(time.time())
+        if not expires_delta:
+            expires_delta = timedelta(minutes=self.access_token_expire_minutes)
         
         to_encode.update({
-            "exp": expire,
-            "iat": datetime.utcnow()
+            "exp": issued_at + int(expires_delta.total_seconds()),
+            "iat": issued_at
         })
         
-        encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
+        encoded_jwt = jwt.encode(to_encode, self._signing_key, algorithm=self.algorithm)
         return encoded_jwt
     
     def verify_token(self, token: str) -> Dict[str, Any]:
@@ -184,13 +217,31 @@ class AuthService:
             AuthError: If token is invalid or expired
         """
         try:
-            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
-            return payload
+            payload = jwt.decode(
+                token,
+                self._signing_key,
+                algorithms=[self.algorithm],
+                options={"require_exp": True}
+            )
             
         except jwt.ExpiredSignatureError:
             raise AuthError("Token has expired")
         except JWTError:
             raise AuthError("Invalid token")
+        
+        # Identity claims are required so callers can trust the payload alone
+        if any(claim not in payload for claim in self.REQUIRED_CLAIMS):
+            raise AuthError("Invalid token")
+        
+        return payload
+    
+    @staticmethod
+    def _bcrypt_rounds(password_hash: str) -> Optional[int]:
+        """Read the work factor from a $2b$NN$... bcrypt hash"""
+        try:
+            return int(password_hash.split('$')[2])
+        except (IndexError, ValueError):
+            return None
     
     def _validate_password_strength(self, password: str) -> None:
         """
@@ -217,10 +268,7 @@ class AuthService:
             User information dict or None if not found
         """
         try:
-            user = database_service.execute_query(
-                "SELECT id, username, workspace_id, is_active, created_at, updated_at FROM users WHERE id = ?",
-                (user_id,)
-            )
+            user = await database_service.execute_query(_SQL_USER_BY_ID, (user_id,))
             
             if user:
                 return {
@@ -1,10 +1,11 @@
 """
 Database service for authentication - bridges old and new database systems
 """
+import asyncio
 import sqlite3
 import logging
 from typing import Optional, Dict, Any, List
-from contextlib import contextmanager
+import aiosqlite
 from ..core.database_manager import get_database_manager
 
 logger = logging.getLogger(__name__)
@@ -16,89 +17,139 @@ class DatabaseService:
     def __init__(self):
         self.database_manager = None
         self._initialized = False
+        self._conn: Optional[aiosqlite.Connection] = None
+        self._connect_lock: Optional[asyncio.Lock] = None
     
     def initialize(self):
         """Initialize database service with database manager"""
         self.database_manager = get_database_manager()
+        self._conn = None
         if self.database_manager:
             self._initialized = True
             logger.info("DatabaseService initialized with DatabaseManager")
         else:
             logger.warning("DatabaseService initialized without DatabaseManager - using fallback")
     
-    @contextmanager
-    def get_auth_db_connection(self):
-        """Get auth database connection"""
-        if not self._initialized:
-            self.initialize()
+    async def _get_conn(self) -> aiosqlite.Connection:
+        """
+        Get the auth database connection
         
-        if self.database_manager and self._initialized:
+        Queries run on a long-lived aiosqlite connection to the auth
+        database, so SQLite I/O happens on aiosqlite's worker thread rather
+        than stalling the event loop. The connection is opened once, with
+        the same settings DatabaseManager applies to its own connections.
+        """
+        conn = self._conn
+        if conn is not None:
+            return conn
+        
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self._conn is not None:
+                return self._conn
+            
+            if not self._initialized:
+                self.initialize()
+            
+            if not (self.database_manager and self._initialized):
+                raise RuntimeError("Auth database not initialized")
+            
             try:
-                conn = self.database_manager.get_connection("auth_db")
-                yield conn
+                db_config = self.database_manager.config["database"]
+                conn = await aiosqlite.connect(
+                    db_config["auth_db_path"],
+                    timeout=db_config.get("connection_timeout", 30),
+                    cached_statements=db_config.get("cached_statements", 256)
+                )
+                # journal_mode=WAL is persistent and already set by the manager
+                await conn.execute("PRAGMA synchronous = NORMAL")
+                await conn.execute("PRAGMA cache_size = -64000")
+                await conn.execute("PRAGMA foreign_keys = ON")
+                await conn.execute("PRAGMA temp_store = MEMORY")
             except Exception as e:
-                logger.error(f"Failed to get auth database connection: {e}")
+                logger.error("Failed to get auth database connection: %s", e)
                 raise RuntimeError("Auth database not initialized")
-        else:
-            raise RuntimeError("Auth database not initialized")
+            
+            conn.row_factory = sqlite3.Row
+            self._conn = conn
+            return conn
     
-    def execute_query(self, query: str, params: tuple = ()) -> Optional[Dict[str, Any]]:
+    async def close(self) -> None:
+        """Close the auth database connection"""
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            await conn.close()
+    
+    async def execute_query(self, query: str, params: tuple = ()) -> Optional[Dict[str, Any]]:
         """Execute a single query and return one result"""
         try:
-            with self.get_auth_db_connection() as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.execute(query, params)
-                result = cursor.fetchone()
-                return dict(result) if result else None
+            conn = await self._get_conn()
+            async with conn.execute(query, params) as cursor:
+                result = await cursor.fetchone()
+            return dict(result) if result else None
         except Exception as e:
-            logger.error(f"Query execution failed: {e}")
+            logger.error("Query execution failed: %s", e)
             raise
     
-    def execute_query_many(self, query: str, params: tuple = ()) -> List[Dict[str, Any]]:
-        """Execute a query and return all results"""
+    async def execute_query_many(self, query: str, params: tuple = ()) -> List[sqlite3.Row]:
+        """
+        Execute a query and return all results
+        
+        Rows are returned as sqlite3.Row, which already supports row["col"]
+        and keys(), so no per-row dict is built.
+        """
         try:
-            with self.get_auth_db_connection() as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.execute(query, params)
-                results = cursor.fetchall()
-                return [dict(row) for row in results]
+            conn = await self._get_conn()
+            async with conn.execute(query, params) as cursor:
+                return list(await cursor.fetchall())
         except Exception as e:
-            logger.error(f"Query execution failed: {e}")
+            logger.error("Query execution failed: %s", e)
             raise
     
-    def execute_insert(self, query: str, params: tuple = ()) -> int:
+    async def execute_insert(self, query: str, params: tuple = ()) -> int:
         """Execute insert query and return last row id"""
         try:
-            with self.get_auth_db_connection() as conn:
-                cursor = conn.execute(query, params)
-                conn.commit()
-                return cursor.lastrowid
+            conn = await self._get_conn()
+            async with conn.execute(query, params) as cursor:
+                last_row_id = cursor.lastrowid
+            await conn.commit()
+            return last_row_id
         except Exception as e:
-            logger.error(f"Insert execution failed: {e}")
+            logger.error("Insert execution failed: %s", e)
             raise
     
-    def execute_update(self, query: str, params: tuple = ()) -> int:
+    async def execute_returning(self, query: str, params: tuple = ()) -> Optional[Dict[str, Any]]:
+        """Execute a write query with a RETURNING clause and return the first row"""
+        try:
+            conn = await self._get_conn()
+            async with conn.execute(query, params) as cursor:
+                result = await cursor.fetchone()
+            await conn.commit()
+            return dict(result) if result else None
+        except Exception as e:
+            logger.error("Write execution failed: %s", e)
+            raise
+    
+    async def execute_update(self, query: str, params: tuple = ()) -> int:
         """Execute update query and return affected rows"""
         try:
-            with self.get_auth_db_connection() as conn:
-                cursor = conn.execute(query, params)
-                conn.commit()
-                return cursor.rowcount
+            conn = await self._get_conn()
+            async with conn.execute(query, params) as cursor:
+                row_count = cursor.rowcount
+            await conn.commit()
+            return row_count
         except Exception as e:
-            logger.error(f"Update execution failed: {e}")
+            logger.error("Update execution failed: %s", e)
             raise
     
-    def get_next_workspace_id(self) -> int:
+    async def get_next_workspace_id(self) -> int:
         """Get next available workspace ID"""
         try:
-            result = self.execute_query(
-                "SELECT MAX(CAST(workspace_id AS INTEGER)) as max_workspace FROM users WHERE workspace_id GLOB '[0-9]*'"
-            )
-            if result and result['max_workspace'] is not None:
-                return result['max_workspace'] + 1
-            return 1
+            result = await self.execute_query("SELECT last_id + 1 AS next_id FROM workspace_id_seq")
+            return result['next_id'] if result else 1
         except Exception as e:
-            logger.error(f"Failed to get next workspace ID: {e}")
+            logger.error("Failed to get next workspace ID: %s", e)
             return 1
 
 
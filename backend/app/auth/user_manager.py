@@ -1,13 +1,18 @@
 import os
 import logging
-import uuid
+import secrets
+import time
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Set
+from cachetools import TTLCache
 
-from ..services.vector_service import vector_store
+from ..services.vector_service import vector_store, workspace_revision
 
 logger = logging.getLogger(__name__)
 
+# Workspace stats cache for session stats polling
+WORKSPACE_STATS_CACHE_TTL_SECONDS = int(os.getenv("WORKSPACE_STATS_CACHE_TTL_SECONDS", "30"))
+
 # Custom exceptions
 class WorkspaceError(Exception):
     """Workspace management error"""
@@ -20,7 +25,14 @@ class UserManager:
         self.current_user: Optional[Dict[str, Any]] = None
         self.current_workspace_id: Optional[int] = None
         self.session_start_time: Optional[datetime] = None
+        # Monotonic start of the session, for computing its duration
+        self._session_start_ns: Optional[int] = None
         self.session_id: Optional[str] = None
+        # Workspace ids whose directory is known to exist; directories are
+        # never removed while the app runs, so hits skip the stat call
+        self._known_workspace_dirs: Set[int] = set()
+        # Keyed by workspace and revision, so document changes are seen at once
+        self._workspace_stats_cache: TTLCache = TTLCache(maxsize=8, ttl=WORKSPACE_STATS_CACHE_TTL_SECONDS)
     
     async def mount_user_workspace(self, user_data: Dict[str, Any]) -> bool:
         """
@@ -40,7 +52,7 @@ class UserManager:
             
             # Check if already mounted to same workspace
             if self.current_workspace_id == user_data["workspace_id"]:
-                logger.info(f"Workspace {workspace_id} already mounted")
+                logger.info("Workspace %s already mounted", workspace_id)
                 return True
             
             # Unmount previous workspace if exists
@@ -51,41 +63,54 @@ class UserManager:
             if not await vector_store.load_workspace(workspace_id):
                 raise WorkspaceError(f"Failed to load workspace {workspace_id}")
             
+            # Stats are cheap once the index is in memory; warm them now so
+            # the dashboard's first session stats call is served from cache
+            if workspace_id in vector_store.workspace_indices:
+                try:
+                    await self._get_workspace_stats(workspace_id)
+                except Exception as e:
+                    logger.warning("Failed to preload stats for workspace %s: %s", workspace_id, e)
+            
             # Setup user session
             self.current_user = user_data
             self.current_workspace_id = user_data["workspace_id"]
             self.session_start_time = datetime.utcnow()
+            self._session_start_ns = time.monotonic_ns()
             self.session_id = self.generate_session_id()
             
-            logger.info(f"User workspace mounted: {user_data['username']} -> workspace_{workspace_id}")
+            logger.info("User workspace mounted: %s -> workspace_%s", user_data['username'], workspace_id)
             return True
             
         except Exception as e:
-            logger.error(f"Failed to mount workspace for {user_data.get('username')}: {e}")
+            logger.error("Failed to mount workspace for %s: %s", user_data.get('username'), e)
             raise WorkspaceError(f"Failed to mount workspace: {str(e)}")
     
     async def unmount_user_workspace(self) -> None:
         """
         Unmount current user's workspace and cleanup session
         """
+        self._workspace_stats_cache.clear()
+        
         try:
             if self.current_workspace_id is not None:
                 workspace_id = str(self.current_workspace_id)
                 await vector_store.unload_workspace(workspace_id)
-                logger.info(f"Workspace {workspace_id} unmounted")
+                logger.info("Workspace %s unmounted", workspace_id)
             
             # Clear session data
             self.current_user = None
             self.current_workspace_id = None
             self.session_start_time = None
+            self._session_start_ns = None
             self.session_id = None
             
         except Exception as e:
-            logger.error(f"Error during workspace unmount: {e}")
+            logger.error("Error during workspace unmount: %s", e)
             # Continue cleanup even if unmounting fails
             self.current_user = None
             self.current_workspace_id = None
             self.session_start_time = None
+            self._session_start_ns = None
             self.session_id = None
     
     def get_current_user(self) -> Optional[Dict[str, Any]]:
@@ -147,13 +172,12 @@ class UserManager:
                 }
             
             # Get workspace stats
-            workspace_stats = await vector_store.get_workspace_stats(str(self.current_workspace_id))
+            workspace_stats = await self._get_workspace_stats(str(self.current_workspace_id))
             
             # Calculate session duration
             session_duration = 0
-            if self.session_start_time:
-                duration_delta = datetime.utcnow() - self.session_start_time
-                session_duration = int(duration_delta.total_seconds() / 60)  # minutes
+            if self._session_start_ns is not None:
+                session_duration = (time.monotonic_ns() - self._session_start_ns) // 60_000_000_000  # minutes
             
             return {
                 "user": {
@@ -169,25 +193,34 @@ class UserManager:
             }
             
         except Exception as e:
-            logger.error(f"Failed to get session stats: {e}")
+            logger.error("Failed to get session stats: %s", e)
             return {
                 "user": self.current_user,
                 "workspace": None,
                 "session_duration_minutes": 0
             }
     
+    async def _get_workspace_stats(self, workspace_id: str) -> Dict[str, Any]:
+        """Get workspace stats, cached until the workspace content changes"""
+        cache_key = (workspace_id, workspace_revision(workspace_id))
+        workspace_stats = self._workspace_stats_cache.get(cache_key)
+        if workspace_stats is None:
+            workspace_stats = await vector_store.get_workspace_stats(workspace_id)
+            self._workspace_stats_cache[cache_key] = workspace_stats
+        return workspace_stats
+    
     async def cleanup_user_session(self) -> None:
         """
         Complete cleanup of user session and resources
         """
         try:
             if self.current_user:
-                logger.info(f"Cleaning up session for user: {self.current_user.get('username')}")
+                logger.info("Cleaning up session for user: %s", self.current_user.get('username'))
             
             await self.unmount_user_workspace()
             
         except Exception as e:
-            logger.error(f"Error during session cleanup: {e}")
+            logger.error("Error during session cleanup: %s", e)
     
     def get_workspace_directory(self, workspace_id: int) -> str:
         """
@@ -204,8 +237,10 @@ class UserManager:
         """
         workspace_dir = f"data/workspaces/workspace_{workspace_id:03d}"
         
-        if not os.path.exists(workspace_dir):
-            raise WorkspaceError(f"Workspace directory not found: {workspace_dir}")
+        if workspace_id not in self._known_workspace_dirs:
+            if not os.path.exists(workspace_dir):
+                raise WorkspaceError(f"Workspace directory not found: {workspace_dir}")
+            self._known_workspace_dirs.add(workspace_id)
         
         return workspace_dir
     
@@ -223,11 +258,12 @@ class UserManager:
         
         try:
             os.makedirs(workspace_dir, exist_ok=True)
-            logger.info(f"Workspace directory initialized: {workspace_dir}")
+            self._known_workspace_dirs.add(workspace_id)
+            logger.info("Workspace directory initialized: %s", workspace_dir)
             return workspace_dir
             
         except Exception as e:
-            logger.error(f"Failed to initialize workspace directory {workspace_dir}: {e}")
+            logger.error("Failed to initialize workspace directory %s: %s", workspace_dir, e)
             raise WorkspaceError(f"Failed to initialize workspace: {str(e)}")
     
     def generate_session_id(self) -> str:
@@ -235,9 +271,9 @@ class UserManager:
         Generate unique session ID
         
         Returns:
-            UUID-based session ID
+            32-character hex session ID (128 random bits)
         """
-        return str(uuid.uuid4()).replace('-', '')
+        return secrets.token_hex(16)
     
     async def refresh_user_session(self) -> None:
         """
@@ -245,7 +281,8 @@ class UserManager:
         """
         if self.is_authenticated():
             self.session_start_time = datetime.utcnow()
-            logger.debug(f"Session refreshed for user: {self.current_user.get('username')}")
+            self._session_start_ns = time.monotonic_ns()
+            logger.debug("Session refreshed for user: %s", self.current_user.get('username'))
     
     async def switch_workspace(self, new_workspace_id: int) -> bool:
         """
@@ -271,11 +308,11 @@ class UserManager:
             # Mount new workspace
             await self.mount_user_workspace(user_data)
             
-            logger.info(f"User {self.current_user.get('username')} switched to workspace {new_workspace_id}")
+            logger.info("User %s switched to workspace %s", self.current_user.get('username'), new_workspace_id)
             return True
             
         except Exception as e:
-            logger.error(f"Failed to switch workspace to {new_workspace_id}: {e}")
+            logger.error("Failed to switch workspace to %s: %s", new_workspace_id, e)
             raise WorkspaceError(f"Failed to switch workspace: {str(e)}")
 
 # Global instance
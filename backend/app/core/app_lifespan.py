@@ -1,13 +1,18 @@
 import asyncio
 import logging
-from typing import Dict, Any, List, Callable, Optional
+import os
+from typing import Dict, Any, List, Callable, Optional, Set, Tuple
 from enum import Enum
 import signal
 import time
+import weakref
 from contextlib import asynccontextmanager
 
 logger = logging.getLogger(__name__)
 
+# Upper bound for each shutdown task; they run concurrently
+SHUTDOWN_TASK_TIMEOUT_SECONDS = float(os.getenv("SHUTDOWN_TASK_TIMEOUT_SECONDS", "10"))
+
 
 class LifespanState(Enum):
     """Application lifespan states"""
@@ -19,6 +24,17 @@ class LifespanState(Enum):
     FAILED = "failed"
 
 
+# Allowed state transitions, keyed by current state
+_VALID_TRANSITIONS = {
+    LifespanState.NOT_STARTED: frozenset({LifespanState.STARTING, LifespanState.FAILED}),
+    LifespanState.STARTING: frozenset({LifespanState.RUNNING, LifespanState.FAILED}),
+    LifespanState.RUNNING: frozenset({LifespanState.STOPPING, LifespanState.FAILED}),
+    LifespanState.STOPPING: frozenset({LifespanState.STOPPED, LifespanState.FAILED}),
+    LifespanState.STOPPED: frozenset({LifespanState.STARTING}),
+    LifespanState.FAILED: frozenset({LifespanState.STARTING, LifespanState.STOPPED}),
+}
+
+
 class LifespanError(Exception):
     """Application lifespan error"""
     pass
@@ -49,8 +65,16 @@ class AppLifespan:
         
         self._startup_tasks: List[Dict[str, Any]] = []
         self._shutdown_tasks: List[Dict[str, Any]] = []
-        
-        self._setup_signal_handlers()
+        # Registered names, for duplicate checks without scanning the lists
+        self._startup_task_names: Set[str] = set()
+        self._shutdown_task_names: Set[str] = set()
+        # Tasks spawned by the lifespan itself; force_shutdown cancels only these
+        self._owned_tasks: "weakref.WeakSet[asyncio.Task]" = weakref.WeakSet()
+        # Last service health result, as (monotonic time, healthy)
+        self._health_cache: Optional[Tuple[float, bool]] = None
+        self._health_cache_ttl = config.get("health", {}).get("cache_ttl", 0.25)
+        # Monotonic time the application last entered RUNNING
+        self._started_monotonic: Optional[float] = None
         
         logger.info("AppLifespan initialized")
     
@@ -63,22 +87,32 @@ class AppLifespan:
                 raise LifespanError(f"Invalid configuration: missing section '{section}'")
     
     def _setup_signal_handlers(self) -> None:
-        """Setup signal handlers for graceful shutdown"""
-        try:
-            signal.signal(signal.SIGINT, self._signal_handler)
-            signal.signal(signal.SIGTERM, self._signal_handler)
-            logger.debug("Signal handlers configured")
-        except (ValueError, OSError) as e:
-            logger.warning(f"Could not setup signal handlers: {e}")
+        """
+        Setup signal handlers for graceful shutdown
+        
+        Must be called from the running event loop. On POSIX the handlers
+        are registered with the loop, so they run as ordinary loop callbacks;
+        loops without add_signal_handler (Windows) fall back to signal.signal.
+        """
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self._signal_handler, sig, None)
+            except NotImplementedError:
+                signal.signal(sig, self._signal_handler)
+            except (ValueError, OSError, RuntimeError) as e:
+                logger.warning("Could not setup signal handlers: %s", e)
+                return
+        logger.debug("Signal handlers configured")
     
     def _signal_handler(self, signum: int, frame) -> None:
         """Handle shutdown signals"""
-        logger.info(f"Received signal {signum}, initiating graceful shutdown")
+        logger.info("Received signal %s, initiating graceful shutdown", signum)
         
         # Create shutdown task if we're in an event loop
         try:
             loop = asyncio.get_running_loop()
-            loop.create_task(self.graceful_shutdown(timeout=30))
+            self._owned_tasks.add(loop.create_task(self.graceful_shutdown(timeout=30)))
         except RuntimeError:
             logger.warning("No event loop running, cannot schedule graceful shutdown")
     
@@ -94,23 +128,21 @@ class AppLifespan:
         if not name or not name.strip():
             raise LifespanError("Invalid task name")
         
-        if not callable(task):
-            raise LifespanError("Task must be a coroutine function")
-        
         if not asyncio.iscoroutinefunction(task):
             raise LifespanError("Task must be a coroutine function")
         
         # Check for duplicates
-        if any(t["name"] == name for t in self._startup_tasks):
+        if name in self._startup_task_names:
             raise LifespanError(f"Startup task '{name}' already registered")
         
+        self._startup_task_names.add(name)
         self._startup_tasks.append({
             "name": name,
             "task": task,
             "critical": critical
         })
         
-        logger.debug(f"Registered startup task: {name} (critical={critical})")
+        logger.debug("Registered startup task: %s (critical=%s)", name, critical)
     
     def register_shutdown_task(self, name: str, task: Callable) -> None:
         """
@@ -123,40 +155,34 @@ class AppLifespan:
         if not name or not name.strip():
             raise LifespanError("Invalid task name")
         
-        if not callable(task):
-            raise LifespanError("Task must be a coroutine function")
-        
         if not asyncio.iscoroutinefunction(task):
             raise LifespanError("Task must be a coroutine function")
         
         # Check for duplicates
-        if any(t["name"] == name for t in self._shutdown_tasks):
+        if name in self._shutdown_task_names:
             raise LifespanError(f"Shutdown task '{name}' already registered")
         
+        self._shutdown_task_names.add(name)
         self._shutdown_tasks.append({
             "name": name,
             "task": task
         })
         
-        logger.debug(f"Registered shutdown task: {name}")
+        logger.debug("Registered shutdown task: %s", name)
     
     def _set_state(self, new_state: LifespanState) -> None:
         """Set application state with validation"""
-        valid_transitions = {
-            LifespanState.NOT_STARTED: [LifespanState.STARTING, LifespanState.FAILED],
-            LifespanState.STARTING: [LifespanState.RUNNING, LifespanState.FAILED],
-            LifespanState.RUNNING: [LifespanState.STOPPING, LifespanState.FAILED],
-            LifespanState.STOPPING: [LifespanState.STOPPED, LifespanState.FAILED],
-            LifespanState.STOPPED: [LifespanState.STARTING],
-            LifespanState.FAILED: [LifespanState.STARTING, LifespanState.STOPPED]
-        }
-        
-        if new_state not in valid_transitions.get(self.state, []):
+        if new_state not in _VALID_TRANSITIONS.get(self.state, ()):
             raise LifespanError(f"Invalid state transition from {self.state} to {new_state}")
         
         old_state = self.state
         self.state = new_state
-        logger.info(f"State transition: {old_state} -> {new_state}")
+        self._health_cache = None
+        if new_state == LifespanState.RUNNING:
+            self._started_monotonic = time.monotonic()
+        elif old_state == LifespanState.RUNNING:
+            self._started_monotonic = None
+        logger.info("State transition: %s -> %s", old_state, new_state)
     
     def _setup_logging(self) -> None:
         """Setup application logging"""
@@ -165,20 +191,23 @@ class AppLifespan:
             log_level = log_config.get("level", "INFO")
             log_file = log_config.get("file")
             
-            # Configure logging
+            handlers = [logging.StreamHandler()]
+            if log_file:
+                handlers.append(logging.FileHandler(log_file))
+            
+            # Configure logging; force replaces the handlers from an earlier
+            # startup, which basicConfig would otherwise silently keep
             logging.basicConfig(
                 level=getattr(logging, log_level.upper()),
                 format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-                handlers=[
-                    logging.StreamHandler(),
-                    logging.FileHandler(log_file) if log_file else logging.NullHandler()
-                ]
+                handlers=handlers,
+                force=True
             )
             
-            logger.info(f"Logging configured: level={log_level}, file={log_file}")
+            logger.info("Logging configured: level=%s, file=%s", log_level, log_file)
             
         except Exception as e:
-            logger.error(f"Failed to setup logging: {e}")
+            logger.error("Failed to setup logging: %s", e)
     
     async def startup(self) -> None:
         """Start the application"""
@@ -192,6 +221,8 @@ class AppLifespan:
             self._set_state(LifespanState.STARTING)
             logger.info("Starting application...")
             
+            self._setup_signal_handlers()
+            
             # Setup logging first
             self._setup_logging()
             
@@ -199,28 +230,41 @@ class AppLifespan:
             logger.info("Initializing services...")
             await self.service_manager.initialize_all_services()
             
-            # Execute startup tasks
-            logger.info("Executing startup tasks...")
-            for task_info in self._startup_tasks:
-                try:
-                    logger.debug(f"Executing startup task: {task_info['name']}")
-                    await task_info["task"]()
-                    logger.debug(f"Completed startup task: {task_info['name']}")
+            # Execute startup tasks (most deployments register none)
+            if self._startup_tasks:
+                logger.info("Executing startup tasks...")
+                
+                # Critical tasks run one at a time, in registration order
+                for task_info in self._startup_tasks:
+                    if not task_info["critical"]:
+                        continue
+                    try:
+                        logger.debug("Executing startup task: %s", task_info['name'])
+                        await task_info["task"]()
+                        logger.debug("Completed startup task: %s", task_info['name'])
                     
-                except Exception as e:
-                    if task_info["critical"]:
-                        logger.error(f"Critical startup task failed: {task_info['name']} - {e}")
+                    except Exception as e:
+                        logger.error("Critical startup task failed: %s - %s", task_info['name'], e)
                         self._set_state(LifespanState.FAILED)
                         raise LifespanError(f"Critical startup task failed: {task_info['name']}")
-                    else:
-                        logger.warning(f"Non-critical startup task failed: {task_info['name']} - {e}")
+                
+                # Non-critical tasks can't block startup, so they run concurrently
+                noncritical = [t for t in self._startup_tasks if not t["critical"]]
+                if noncritical:
+                    results = await asyncio.gather(
+                        *(t["task"]() for t in noncritical),
+                        return_exceptions=True
+                    )
+                    for task_info, result in zip(noncritical, results):
+                        if isinstance(result, Exception):
+                            logger.warning("Non-critical startup task failed: %s - %s", task_info['name'], result)
             
             self._set_state(LifespanState.RUNNING)
             logger.info("Application started successfully")
-            
+        
         except Exception as e:
             self._set_state(LifespanState.FAILED)
-            logger.error(f"Application startup failed: {e}")
+            logger.error("Application startup failed: %s", e)
             raise LifespanError(f"Application startup failed: {str(e)}")
     
     async def shutdown(self) -> None:
@@ -237,30 +281,37 @@ class AppLifespan:
             self._set_state(LifespanState.STOPPING)
             logger.info("Shutting down application...")
             
-            # Execute shutdown tasks in reverse order
-            logger.info("Executing shutdown tasks...")
-            for task_info in reversed(self._shutdown_tasks):
-                try:
-                    logger.debug(f"Executing shutdown task: {task_info['name']}")
-                    await task_info["task"]()
-                    logger.debug(f"Completed shutdown task: {task_info['name']}")
-                    
-                except Exception as e:
+            # Shutdown tasks are independent, so they run concurrently (started
+            # in reverse registration order), each bounded by its own timeout
+            if self._shutdown_tasks:
+                logger.info("Executing shutdown tasks...")
+                shutdown_tasks = list(reversed(self._shutdown_tasks))
+                results = await asyncio.gather(
+                    *(
+                        asyncio.wait_for(t["task"](), timeout=SHUTDOWN_TASK_TIMEOUT_SECONDS)
+                        for t in shutdown_tasks
+                    ),
+                    return_exceptions=True
+                )
+                for task_info, result in zip(shutdown_tasks, results):
                     # Shutdown tasks should not prevent shutdown
-                    logger.error(f"Shutdown task failed: {task_info['name']} - {e}")
+                    if isinstance(result, asyncio.TimeoutError):
+                        logger.error("Shutdown task timed out: %s", task_info['name'])
+                    elif isinstance(result, Exception):
+                        logger.error("Shutdown task failed: %s - %s", task_info['name'], result)
             
             # Cleanup services
             logger.info("Cleaning up services...")
             try:
                 await self.service_manager.cleanup_all_services()
             except Exception as e:
-                logger.error(f"Service cleanup failed: {e}")
+                logger.error("Service cleanup failed: %s", e)
             
             self._set_state(LifespanState.STOPPED)
             logger.info("Application shutdown completed")
             
         except Exception as e:
-            logger.error(f"Error during shutdown: {e}")
+            logger.error("Error during shutdown: %s", e)
             # Force stopped state even if there were errors
             self.state = LifespanState.STOPPED
     
@@ -276,20 +327,22 @@ class AppLifespan:
     
     async def graceful_shutdown(self, timeout: float = 30) -> None:
         """Perform graceful shutdown with timeout"""
-        logger.info(f"Starting graceful shutdown with {timeout}s timeout")
+        logger.info("Starting graceful shutdown with %ss timeout", timeout)
         
         try:
             await asyncio.wait_for(self.shutdown(), timeout=timeout)
         except asyncio.TimeoutError:
-            logger.warning(f"Graceful shutdown timed out after {timeout}s")
+            logger.warning("Graceful shutdown timed out after %ss", timeout)
             await self.force_shutdown()
     
     async def force_shutdown(self) -> None:
         """Force immediate shutdown"""
         logger.warning("Forcing immediate shutdown")
         
-        # Cancel all running tasks
-        tasks = [task for task in asyncio.all_tasks() if not task.done()]
+        # Cancel the tasks the lifespan started; request handlers and the
+        # caller's own task are left to the server
+        current = asyncio.current_task()
+        tasks = [task for task in self._owned_tasks if not task.done() and task is not current]
         for task in tasks:
             task.cancel()
         
@@ -305,29 +358,37 @@ class AppLifespan:
         if self.state != LifespanState.RUNNING:
             return False
         
+        # Probes poll this far more often than service health changes
+        cached = self._health_cache
+        if cached is not None and time.monotonic() - cached[0] < self._health_cache_ttl:
+            return cached[1]
+        
         try:
             # Check service health
             services_health = self.service_manager.get_services_health()
-            return all(services_health.values())
+            healthy = all(services_health.values())
         except Exception as e:
-            logger.error(f"Health check failed: {e}")
+            logger.error("Health check failed: %s", e)
             return False
+        
+        self._health_cache = (time.monotonic(), healthy)
+        return healthy
     
     def get_health_status(self) -> Dict[str, Any]:
         """Get detailed health status"""
         try:
-            services_health = self.service_manager.get_services_health()
-            initialization_status = self.service_manager.get_initialization_status()
+            # One service sweep serves both the detail and the healthy flag
+            status = self.service_manager.get_full_status()
             
             return {
                 "state": self.state,
-                "healthy": self.is_healthy(),
-                "services": services_health,
-                "initialization": initialization_status,
+                "healthy": self.state == LifespanState.RUNNING and status["all_healthy"],
+                "services": status["services"],
+                "initialization": status["initialization"],
                 "uptime": self._get_uptime()
             }
         except Exception as e:
-            logger.error(f"Failed to get health status: {e}")
+            logger.error("Failed to get health status: %s", e)
             return {
                 "state": self.state,
                 "healthy": False,
@@ -335,9 +396,10 @@ class AppLifespan:
             }
     
     def _get_uptime(self) -> Optional[float]:
-        """Get application uptime in seconds"""
-        # This would track startup time in a real implementation
-        return None
+        """Get application uptime in seconds, or None when not running"""
+        if self._started_monotonic is None:
+            return None
+        return time.monotonic() - self._started_monotonic
     
     async def __aenter__(self):
         """Async context manager entry"""
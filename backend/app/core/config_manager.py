@@ -55,6 +55,7 @@ class ConfigManager:
             "type_validation": {
                 "database.connection_timeout": int,
                 "database.max_connections": int,
+                "database.cached_statements": int,
                 "model.max_context_length": int,
                 "model.batch_size": int,
                 "api.port": int,
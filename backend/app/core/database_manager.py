@@ -26,7 +26,7 @@ class MigrationError(DatabaseError):
 class DatabaseManager:
     """Manages database connections, initialization, and migrations"""
     
-    CURRENT_SCHEMA_VERSION = 3
+    CURRENT_SCHEMA_VERSION = 7
     
     def __init__(self, config: Dict[str, Any]):
         """
@@ -78,7 +78,8 @@ class DatabaseManager:
             conn = sqlite3.connect(
                 db_path,
                 timeout=db_config.get("connection_timeout", 30),
-                check_same_thread=False
+                check_same_thread=False,
+                cached_statements=db_config.get("cached_statements", 256)
             )
             
             # Configure connection
@@ -110,7 +111,8 @@ class DatabaseManager:
             conn = sqlite3.connect(
                 db_path,
                 timeout=db_config.get("connection_timeout", 30),
-                check_same_thread=False
+                check_same_thread=False,
+                cached_statements=db_config.get("cached_statements", 256)
             )
             
             # Configure connection
@@ -166,6 +168,10 @@ class DatabaseManager:
                 conn.execute(schema)
                 logger.debug(f"Created auth table: {table_name}")
             
+            for name, schema in self._get_auth_sequence_schemas().items():
+                conn.execute(schema)
+                logger.debug(f"Created auth sequence object: {name}")
+            
             # Create version table
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS schema_version (
@@ -196,6 +202,10 @@ class DatabaseManager:
                 conn.execute(schema)
                 logger.debug(f"Created metadata table: {table_name}")
             
+            for index_name, schema in self._get_metadata_index_schemas().items():
+                conn.execute(schema)
+                logger.debug(f"Created metadata index: {index_name}")
+            
             # Create version table
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS schema_version (
@@ -245,6 +255,38 @@ class DatabaseManager:
             """
         }
     
+    def _get_auth_sequence_schemas(self) -> Dict[str, str]:
+        """
+        Get the workspace id sequence schemas for the auth database
+        
+        The counter is seeded once from existing users and the trigger keeps
+        it at the highest numeric workspace id, so allocating the next id is
+        a single-row read instead of a MAX(CAST(...)) scan over users. Every
+        statement is idempotent.
+        """
+        return {
+            "workspace_id_seq": """
+                CREATE TABLE IF NOT EXISTS workspace_id_seq (last_id INTEGER NOT NULL)
+            """,
+            "workspace_id_seq_seed": """
+                INSERT INTO workspace_id_seq (last_id)
+                SELECT (
+                    SELECT COALESCE(MAX(CAST(workspace_id AS INTEGER)), 0)
+                    FROM users WHERE workspace_id GLOB '[0-9]*'
+                )
+                WHERE NOT EXISTS (SELECT 1 FROM workspace_id_seq)
+            """,
+            "users_workspace_id_seq": """
+                CREATE TRIGGER IF NOT EXISTS users_workspace_id_seq
+                AFTER INSERT ON users
+                WHEN NEW.workspace_id GLOB '[0-9]*'
+                BEGIN
+                    UPDATE workspace_id_seq SET last_id = CAST(NEW.workspace_id AS INTEGER)
+                    WHERE last_id < CAST(NEW.workspace_id AS INTEGER);
+                END
+            """
+        }
+    
     def _get_metadata_table_schemas(self) -> Dict[str, str]:
         """Get metadata database table schemas"""
         return {
@@ -292,6 +334,15 @@ class DatabaseManager:
             """
         }
     
+    def _get_metadata_index_schemas(self) -> Dict[str, str]:
+        """Get metadata database index schemas"""
+        return {
+            "idx_documents_workspace_created": """
+                CREATE INDEX IF NOT EXISTS idx_documents_workspace_created
+                ON documents (workspace_id, created_at DESC, id DESC)
+            """
+        }
+    
     def get_connection(self, name: str) -> sqlite3.Connection:
         """
         Get database connection
@@ -485,6 +536,7 @@ class DatabaseManager:
     def _get_migration_scripts(self, db_name: str) -> List[Dict[str, Any]]:
         """Get migration scripts for database"""
         if db_name == "auth_db":
+            sequence_schemas = self._get_auth_sequence_schemas()
             return [
                 {
                     "version": 2,
@@ -493,6 +545,18 @@ class DatabaseManager:
                 {
                     "version": 3,
                     "script": "CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);"
+                },
+                {
+                    "version": 5,
+                    "script": sequence_schemas["workspace_id_seq"]
+                },
+                {
+                    "version": 6,
+                    "script": sequence_schemas["workspace_id_seq_seed"]
+                },
+                {
+                    "version": 7,
+                    "script": sequence_schemas["users_workspace_id_seq"]
                 }
             ]
         elif db_name == "metadata_db":
@@ -504,6 +568,10 @@ class DatabaseManager:
                 {
                     "version": 3,
                     "script": "CREATE INDEX IF NOT EXISTS idx_chunks_document ON document_chunks(document_id);"
+                },
+                {
+                    "version": 4,
+                    "script": "CREATE INDEX IF NOT EXISTS idx_documents_workspace_created ON documents(workspace_id, created_at DESC, id DESC);"
                 }
             ]
         
@@ -384,6 +384,21 @@ class ServiceManager:
             "services": list(self._services.keys())
         }
     
+    def get_full_status(self) -> Dict[str, Any]:
+        """
+        Get service health and initialization status in one call
+        
+        Returns:
+            Dict with "services" (per-service health), "initialization"
+            and "all_healthy"
+        """
+        services_health = self.get_services_health()
+        return {
+            "services": services_health,
+            "initialization": self.get_initialization_status(),
+            "all_healthy": all(services_health.values())
+        }
+    
     async def restart_service(self, service_name: str) -> None:
         """Restart individual service"""
         if service_name not in self._services:
@@ -1,11 +1,13 @@
 import logging
 import os
+import queue
 import sys
 from contextlib import asynccontextmanager
-from typing import Dict, Any
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Any, Optional
 from fastapi import FastAPI, HTTPException
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 # Core components
@@ -14,6 +16,7 @@ from app.core.database_manager import DatabaseManager, initialize_database_manag
 from app.core.service_manager import ServiceManager, initialize_service_manager
 from app.core.app_lifespan import AppLifespan, initialize_app_lifespan
 from app.core.api_integration import APIIntegration, initialize_api_integration
+from app.auth.database_service import database_service
 
 # Configure logging
 logging.basicConfig(
@@ -22,6 +25,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Background thread writing log records while the app runs
+_log_listener: Optional[QueueListener] = None
+
 
 # Global application components
 config_manager: ConfigManager = None
@@ -64,6 +70,8 @@ def load_default_config() -> Dict[str, Any]:
             "metadata_db_path": os.path.join(data_dir, "metadata.db"),
             "connection_timeout": 30,
             "max_connections": 10,
+            # Prepared statements kept per SQLite connection (keyed by SQL text)
+            "cached_statements": 256,
             "enable_wal": True,
             "create_tables": True
         },
@@ -81,7 +89,9 @@ def load_default_config() -> Dict[str, Any]:
         "api": {
             "host": "127.0.0.1",
             "port": 8000,
-            "cors_origins": ["http://localhost:3000", "http://localhost:3001", "http://127.0.0.1:3000", "*"],
+            # Dev server origins, plus "null" for the packaged Electron
+            # renderer, which loads index.html from file://
+            "cors_origins": ["http://localhost:3000", "http://localhost:3001", "http://127.0.0.1:3000", "null"],
             "trusted_hosts": ["localhost", "127.0.0.1", "0.0.0.0"],
             "max_request_size": 100 * 1024 * 1024  # 100MB
         },
@@ -110,6 +120,35 @@ def load_default_config() -> Dict[str, Any]:
     }
 
 
+def start_log_listener() -> None:
+    """
+    Hand log records to a background thread
+    
+    The root handlers move behind a QueueListener, so request handlers only
+    enqueue records and the stream/file writes happen off the event loop.
+    """
+    global _log_listener
+    if _log_listener is not None:
+        return
+    
+    root_logger = logging.getLogger()
+    log_queue = queue.SimpleQueue()
+    _log_listener = QueueListener(log_queue, *root_logger.handlers, respect_handler_level=True)
+    root_logger.handlers = [QueueHandler(log_queue)]
+    _log_listener.start()
+
+
+def stop_log_listener() -> None:
+    """Flush queued log records and restore the root handlers"""
+    global _log_listener
+    listener, _log_listener = _log_listener, None
+    if listener is None:
+        return
+    
+    listener.stop()
+    logging.getLogger().handlers = list(listener.handlers)
+
+
 async def initialize_application_components(config: Dict[str, Any]) -> None:
     """Initialize all application components"""
     global config_manager, database_manager, service_manager, app_lifespan, api_integration
@@ -154,6 +193,8 @@ async def cleanup_application_components() -> None:
         if service_manager:
             await service_manager.cleanup_all_services()
         
+        await database_service.close()
+        
         if database_manager:
             await database_manager.cleanup_all_databases()
         
@@ -161,26 +202,37 @@ async def cleanup_application_components() -> None:
         
     except Exception as e:
         logger.error(f"Error during cleanup: {e}")
+    
+    stop_log_listener()
+
+
+def load_app_config() -> Dict[str, Any]:
+    """Load the default configuration merged with CONFIG_FILE, if set"""
+    config = load_default_config()
+    
+    # Load configuration file if specified
+    config_file = os.getenv("CONFIG_FILE")
+    if config_file and os.path.exists(config_file):
+        temp_config_manager = ConfigManager()
+        temp_config_manager.load_from_file(config_file)
+        file_config = temp_config_manager.export_to_dict()
+        
+        # Merge with default config
+        temp_config_manager.load_from_dict(config)
+        temp_config_manager.merge_configuration(file_config)
+        config = temp_config_manager.export_to_dict()
+    
+    return config
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """FastAPI lifespan context manager"""
+    start_log_listener()
+    
     try:
         # Load configuration
-        config = load_default_config()
-        
-        # Load configuration file if specified
-        config_file = os.getenv("CONFIG_FILE")
-        if config_file and os.path.exists(config_file):
-            temp_config_manager = ConfigManager()
-            temp_config_manager.load_from_file(config_file)
-            file_config = temp_config_manager.export_to_dict()
-            
-            # Merge with default config
-            temp_config_manager.load_from_dict(config)
-            temp_config_manager.merge_configuration(file_config)
-            config = temp_config_manager.export_to_dict()
+        config = load_app_config()
         
         # Initialize all components
         await initialize_application_components(config)
@@ -226,15 +278,23 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-# Add CORS middleware for frontend compatibility
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Allow all origins for development
-    allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "HEAD"],
-    allow_headers=["*"],
-    expose_headers=["*"]
-)
+# Add CORS middleware for the configured frontend origins. Middleware can't
+# be added once the app has started, so this reads the config at import.
+cors_origins = load_app_config()["api"].get("cors_origins", [])
+if cors_origins:
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=cors_origins,
+        allow_credentials=True,
+        allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "HEAD"],
+        allow_headers=["*"],
+        expose_headers=["*"]
+    )
+
+
+# Fixed status payloads, encoded once
+STATUS_STARTING_BODY = b'{"status":"starting","version":"1.0.0","message":"Application is initializing"}'
+BACKEND_STATUS_BODY = b'{"status":"running","ready":true}'
 
 
 # Health check endpoint (enhanced)
@@ -246,19 +306,15 @@ async def get_status():
             services_health = service_manager.get_services_health()
             initialization_status = service_manager.get_initialization_status()
             
-            return {
+            return ORJSONResponse({
                 "status": "healthy" if all(services_health.values()) else "degraded",
                 "version": "1.0.0",
                 "services": services_health,
                 "initialization": initialization_status,
                 "model_loaded": services_health.get("model_manager", False)
-            }
+            })
         else:
-            return {
-                "status": "starting",
-                "version": "1.0.0",
-                "message": "Application is initializing"
-            }
+            return Response(content=STATUS_STARTING_BODY, media_type="application/json")
     except Exception as e:
         logger.error(f"Status check failed: {e}")
         raise HTTPException(status_code=503, detail="Service unhealthy")
@@ -270,20 +326,10 @@ async def api_health_check():
     """Health check endpoint for frontend compatibility"""
     return await get_status()
 
-@app.options("/api/health-check")
-async def api_health_check_options():
-    """CORS preflight for health check"""
-    return {"message": "OK"}
-
 @app.get("/api/backend-status")
 async def api_backend_status():
     """Backend status endpoint for Electron frontend"""
-    return {"status": "running", "ready": True}
-
-@app.options("/api/backend-status")
-async def api_backend_status_options():
-    """CORS preflight for backend status"""
-    return {"message": "OK"}
+    return Response(content=BACKEND_STATUS_BODY, media_type="application/json")
 
 
 # Root endpoint
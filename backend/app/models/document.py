@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, Float, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 
@@ -53,4 +53,14 @@ class DocumentChunk(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     
     def __repr__(self):
-        return f"<DocumentChunk(document_id={self.document_id}, chunk_index={self.chunk_index})>"
\ No newline at end of file
+        return f"<DocumentChunk(document_id={self.document_id}, chunk_index={self.chunk_index})>"
+
+# Composite index for workspace listings (newest first). Ordered chunk reads
+# use the schema's UNIQUE (document_id, chunk_index) constraint, which SQLite
+# already backs with an index.
+Index(
+    "idx_documents_workspace_created",
+    Document.workspace_id,
+    Document.created_at.desc(),
+    Document.id.desc()
+)
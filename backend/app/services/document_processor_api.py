@@ -2,13 +2,13 @@
 Document processor service for API endpoints - integrates with real services
 """
 import os
-import tempfile
+import asyncio
 import hashlib
 import logging
+from functools import lru_cache
 from typing import Dict, Any, Optional
 from datetime import datetime
-from fastapi import UploadFile
-from sqlalchemy import select
+from sqlalchemy import select, update
 
 from ..core.database_manager import database_manager
 from ..models.document import Document, DocumentChunk
@@ -22,6 +22,8 @@ class DocumentProcessingError(Exception):
     """Exception raised during document processing"""
     pass
 
+HASH_CHUNK_SIZE = 1024 * 1024  # 1MB
+
 class DocumentProcessor:
     """Real document processor for API endpoints"""
     
@@ -29,107 +31,176 @@ class DocumentProcessor:
         self.workspace_id = workspace_id
         self.chunking_service = SemanticChunking(chunk_size=512, chunk_overlap=50)
     
-    async def process_document(self, file: UploadFile, user_id: int) -> Dict[str, Any]:
+    async def create_document(
+        self,
+        file_path: str,
+        filename: str,
+        content_type: Optional[str],
+        user_id: int,
+        content_hash: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
-        Process uploaded document through the complete pipeline
+        Record an uploaded document as pending processing
         
         Args:
-            file: Uploaded file from FastAPI
+            file_path: Path to the uploaded file on disk
+            filename: Original filename of the upload
+            content_type: MIME type reported by the client
             user_id: User ID for ownership
+            content_hash: SHA-256 hex digest of the file, if already computed
             
         Returns:
-            Processing result dictionary
+            Dictionary with the new document's id, filename, content hash
+            and processing status
         """
-        temp_file_path = None
         try:
-            # Read file content
-            content = await file.read()
+            file_size = os.path.getsize(file_path)
             
-            # Generate content hash
-            content_hash = hashlib.sha256(content).hexdigest()
+            # Generate content hash without loading the whole file
+            if content_hash is None:
+                content_hash = self._hash_file(file_path)
             
-            # Check for duplicates
             async with database_manager.get_session() as db:
-                existing_query = select(Document).where(
+                # Check for duplicates
+                existing_query = select(Document.id, Document.processing_status).where(
                     Document.content_hash == content_hash,
                     Document.workspace_id == self.workspace_id
                 )
                 result = await db.execute(existing_query)
-                existing_doc = result.scalar_one_or_none()
-                
-                if existing_doc:
-                    raise DocumentProcessingError("Document already exists")
-                
-                # Save to temporary file for PDF processing
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-                    temp_file.write(content)
-                    temp_file_path = temp_file.name
-                
-                # Process PDF - extract text with page information
-                logger.info(f"Extracting text from PDF: {file.filename}")
-                pdf_result = pdf_service.extract_text_from_pdf(temp_file_path)
-                text_content = pdf_result["text"]
-                pdf_metadata = pdf_result["metadata"]
-                pages = pdf_result.get("pages", [])
-                
-                if not text_content or not text_content.strip():
-                    raise DocumentProcessingError("No text content found in PDF")
-                
-                # Chunk the text with page information
-                logger.info("Chunking text content with page tracking")
-                if pages:
-                    chunks = self.chunking_service.chunk_pages(pages, document_id=f"doc_{content_hash[:8]}")
-                else:
-                    # Fallback to old method if pages not available
-                    chunks = self.chunking_service.chunk_text(text_content, document_id=f"doc_{content_hash[:8]}")
-                
-                if not chunks:
-                    raise DocumentProcessingError("No chunks generated from document")
-                
-                # Initialize vector store for workspace
-                await vector_store.initialize()
-                await vector_store.load_workspace(str(self.workspace_id))
-                
-                # Generate embeddings and add to vector store
-                logger.info(f"Adding {len(chunks)} chunks to vector store")
-                chunk_texts = [chunk['text'] for chunk in chunks]
-                chunk_metadata = [{
-                    'document_id': content_hash[:8],
-                    'chunk_index': chunk['chunk_id'],
-                    'filename': file.filename,
-                    'page': chunk.get('page_number', 1)
-                } for chunk in chunks]
+                existing = result.first()
                 
-                vector_ids = await vector_store.add_documents(
-                    workspace_id=str(self.workspace_id),
-                    texts=chunk_texts,
-                    metadata=chunk_metadata
-                )
+                if existing is not None:
+                    if existing.processing_status != "failed":
+                        raise DocumentProcessingError("Document already exists")
+                    
+                    # A failed upload of the same file is retried in place
+                    await db.execute(
+                        update(Document).where(Document.id == existing.id).values(
+                            filename=filename,
+                            original_filename=filename,
+                            file_path=file_path,
+                            file_size=file_size,
+                            mime_type=content_type,
+                            processing_status="pending",
+                            error_message=None,
+                            created_at=datetime.utcnow()
+                        )
+                    )
+                    await db.commit()
+                    
+                    return {
+                        "document_id": existing.id,
+                        "filename": filename,
+                        "content_hash": content_hash,
+                        "processing_status": "pending",
+                        "total_chunks": None
+                    }
                 
-                # Create document record
                 new_document = Document(
                     workspace_id=self.workspace_id,
-                    filename=file.filename,
-                    original_filename=file.filename,
-                    file_path=temp_file_path,
-                    file_size=len(content),
+                    filename=filename,
+                    original_filename=filename,
+                    file_path=file_path,
+                    file_size=file_size,
                     content_hash=content_hash,
-                    mime_type=file.content_type,
-                    processing_status="completed",
-                    total_pages=pdf_metadata["page_count"],
-                    total_chunks=len(chunks),
-                    created_at=datetime.utcnow(),
-                    processed_at=datetime.utcnow()
+                    mime_type=content_type,
+                    processing_status="pending",
+                    created_at=datetime.utcnow()
                 )
                 
                 db.add(new_document)
                 await db.commit()
                 await db.refresh(new_document)
                 
+                return {
+                    "document_id": new_document.id,
+                    "filename": new_document.filename,
+                    "content_hash": content_hash,
+                    "processing_status": new_document.processing_status,
+                    "total_chunks": None
+                }
+                
+        except DocumentProcessingError:
+            raise
+        except Exception as e:
+            logger.error(f"Document registration failed: {e}")
+            raise DocumentProcessingError(f"Processing failed: {str(e)}")
+    
+    async def run_pipeline(
+        self,
+        document_id: int,
+        file_path: str,
+        filename: str,
+        content_hash: str
+    ) -> Dict[str, Any]:
+        """
+        Extract, chunk and index a pending document
+        
+        The document row is marked processing while this runs and completed
+        or failed when it finishes.
+        
+        Args:
+            document_id: ID of the pending document record
+            file_path: Path to the uploaded file on disk
+            filename: Original filename of the upload
+            content_hash: SHA-256 hex digest of the file
+            
+        Returns:
+            Processing result dictionary
+        """
+        await self._update_document(document_id, processing_status="processing")
+        
+        try:
+            # Process PDF - extract text with page information
+            logger.info(f"Extracting text from PDF: {filename}")
+            pdf_result = await asyncio.to_thread(pdf_service.extract_text_from_pdf, file_path)
+            text_content = pdf_result["text"]
+            pdf_metadata = pdf_result["metadata"]
+            pages = pdf_result.get("pages", [])
+            
+            if not text_content or not text_content.strip():
+                raise DocumentProcessingError("No text content found in PDF")
+            
+            # Chunk the text with page information
+            logger.info("Chunking text content with page tracking")
+            if pages:
+                chunks = await asyncio.to_thread(
+                    self.chunking_service.chunk_pages, pages, document_id=f"doc_{content_hash[:8]}"
+                )
+            else:
+                # Fallback to old method if pages not available
+                chunks = await asyncio.to_thread(
+                    self.chunking_service.chunk_text, text_content, document_id=f"doc_{content_hash[:8]}"
+                )
+            
+            if not chunks:
+                raise DocumentProcessingError("No chunks generated from document")
+            
+            # Initialize vector store for workspace
+            await vector_store.initialize()
+            await vector_store.load_workspace(str(self.workspace_id))
+            
+            # Generate embeddings and add to vector store
+            logger.info(f"Adding {len(chunks)} chunks to vector store")
+            chunk_texts = [chunk['text'] for chunk in chunks]
+            chunk_metadata = [{
+                'document_id': content_hash[:8],
+                'chunk_index': chunk['chunk_id'],
+                'filename': filename,
+                'page': chunk.get('page_number', 1)
+            } for chunk in chunks]
+            
+            vector_ids = await vector_store.add_documents(
+                workspace_id=str(self.workspace_id),
+                texts=chunk_texts,
+                metadata=chunk_metadata
+            )
+            
+            async with database_manager.get_session() as db:
                 # Create chunk records
-                for i, (chunk, vector_id) in enumerate(zip(chunks, vector_ids)):
+                for chunk, vector_id in zip(chunks, vector_ids):
                     chunk_record = DocumentChunk(
-                        document_id=new_document.id,
+                        document_id=document_id,
                         workspace_id=self.workspace_id,
                         chunk_text=chunk['text'][:1000],  # Store preview
                         chunk_index=chunk['chunk_id'],
@@ -141,28 +212,106 @@ class DocumentProcessor:
                     db.add(chunk_record)
                 
                 await db.commit()
-                
-                logger.info(f"Document processed successfully: {file.filename} ({len(chunks)} chunks)")
-                
-                return {
-                    "document_id": new_document.id,
-                    "filename": new_document.filename,
-                    "processing_status": new_document.processing_status,
-                    "total_chunks": new_document.total_chunks
-                }
-                
-        except DocumentProcessingError:
-            raise
+            
+            await self._update_document(
+                document_id,
+                processing_status="completed",
+                total_pages=pdf_metadata["page_count"],
+                total_chunks=len(chunks),
+                processed_at=datetime.utcnow()
+            )
+            
+            logger.info(f"Document processed successfully: {filename} ({len(chunks)} chunks)")
+            
+            return {
+                "document_id": document_id,
+                "filename": filename,
+                "processing_status": "completed",
+                "total_chunks": len(chunks)
+            }
+            
         except Exception as e:
-            logger.error(f"Document processing failed: {e}")
+            logger.error(f"Document processing failed for {filename}: {e}")
+            await self._update_document(
+                document_id,
+                processing_status="failed",
+                error_message=str(e)
+            )
+            if isinstance(e, DocumentProcessingError):
+                raise
             raise DocumentProcessingError(f"Processing failed: {str(e)}")
+    
+    async def process_in_background(
+        self,
+        document_id: int,
+        file_path: str,
+        filename: str,
+        content_hash: str
+    ) -> None:
+        """
+        Run the processing pipeline for a pending document as a background job
+        
+        Failures are recorded on the document row rather than raised, and the
+        uploaded file is removed once processing finishes.
+        """
+        try:
+            await self.run_pipeline(document_id, file_path, filename, content_hash)
+        except Exception as e:
+            logger.error(f"Background processing failed for document {document_id}: {e}")
         finally:
-            # Clean up temporary file
-            if temp_file_path and os.path.exists(temp_file_path):
+            if os.path.exists(file_path):
                 try:
-                    os.unlink(temp_file_path)
+                    os.unlink(file_path)
                 except Exception as e:
-                    logger.warning(f"Failed to cleanup temp file {temp_file_path}: {e}")
+                    logger.warning(f"Failed to cleanup temp file {file_path}: {e}")
+    
+    async def process_document(
+        self,
+        file_path: str,
+        filename: str,
+        content_type: Optional[str],
+        user_id: int,
+        content_hash: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Process uploaded document through the complete pipeline
+        
+        Args:
+            file_path: Path to the uploaded file on disk (owned by the caller)
+            filename: Original filename of the upload
+            content_type: MIME type reported by the client
+            user_id: User ID for ownership
+            content_hash: SHA-256 hex digest of the file, if already computed
+            
+        Returns:
+            Processing result dictionary
+        """
+        document = await self.create_document(
+            file_path, filename, content_type, user_id, content_hash
+        )
+        return await self.run_pipeline(
+            document["document_id"], file_path, filename, document["content_hash"]
+        )
+    
+    async def _update_document(self, document_id: int, **values: Any) -> None:
+        """Update columns on a document record"""
+        try:
+            async with database_manager.get_session() as db:
+                await db.execute(
+                    update(Document).where(Document.id == document_id).values(**values)
+                )
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Failed to update document {document_id}: {e}")
+    
+    @staticmethod
+    def _hash_file(file_path: str) -> str:
+        """Compute the SHA-256 hex digest of a file in fixed-size chunks"""
+        sha256 = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            while chunk := f.read(HASH_CHUNK_SIZE):
+                sha256.update(chunk)
+        return sha256.hexdigest()
     
     async def delete_document(self, document_id: int, workspace_id: int) -> bool:
         """
@@ -221,4 +370,15 @@ class DocumentProcessor:
                 
         except Exception as e:
             logger.error(f"Document deletion failed: {e}")
-            raise DocumentProcessingError(f"Deletion failed: {str(e)}")
\ No newline at end of file
+            raise DocumentProcessingError(f"Deletion failed: {str(e)}")
+
+
+@lru_cache(maxsize=128)
+def get_document_processor(workspace_id: int) -> DocumentProcessor:
+    """
+    Get the shared DocumentProcessor for a workspace
+    
+    Processors are reused across requests so the chunking service keeps its
+    lazily loaded spaCy model instead of reloading it on every upload.
+    """
+    return DocumentProcessor(workspace_id)
@@ -1,12 +1,17 @@
 import os
 import logging
-from typing import Optional, AsyncGenerator
-from llama_cpp import Llama
+import threading
+import time
+from typing import Optional, AsyncGenerator, Tuple
+from llama_cpp import Llama, StoppingCriteriaList
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
 
+# Wall-clock cap for a single streamed generation
+STREAM_GENERATION_TIMEOUT_SECONDS = float(os.getenv("LLM_STREAM_TIMEOUT_SECONDS", "120"))
+
 class ModelManager:
     """Singleton Phi-2 model manager with streaming support"""
     
@@ -66,30 +71,50 @@ class ModelManager:
     
     async def generate(self, prompt: str, max_tokens: int = 1024, temperature: float = 0.7) -> str:
         """Generate response (non-streaming)"""
+        text, _ = await self.generate_with_usage(prompt, max_tokens, temperature)
+        return text
+    
+    async def generate_with_usage(
+        self, prompt: str, max_tokens: int = 1024, temperature: float = 0.7
+    ) -> Tuple[str, Optional[int]]:
+        """
+        Generate response (non-streaming) with the completion token count
+        
+        Returns:
+            Tuple of (response text, completion tokens reported by llama.cpp
+            or None if unavailable)
+        """
         if not self.is_loaded():
             raise RuntimeError("Model not loaded")
 
         try:
             loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
+            return await loop.run_in_executor(
                 self._executor,
                 self._generate_sync,
                 prompt,
                 max_tokens,
-                temperature,
-                False
+                temperature
             )
-            return response
 
         except Exception as e:
             logger.error(f"Generation failed: {e}")
             raise RuntimeError(f"Generation failed: {e}")
     
     async def generate_stream(self, prompt: str, max_tokens: int = 1024, temperature: float = 0.7) -> AsyncGenerator[str, None]:
-        """Generate streaming response"""
+        """
+        Generate streaming response
+        
+        Generation stops early once STREAM_GENERATION_TIMEOUT_SECONDS have
+        passed, or when the consumer stops iterating (for example when the
+        SSE client disconnects and its task is cancelled).
+        """
         if not self.is_loaded():
             raise RuntimeError("Model not loaded")
 
+        # Checked by the worker thread between tokens
+        cancel_event = threading.Event()
+
         try:
             # Create a queue for streaming tokens
             token_queue = asyncio.Queue()
@@ -105,20 +130,25 @@ class ModelManager:
                 max_tokens,
                 temperature,
                 token_queue,
-                loop  # Pass the loop to the thread
+                loop,  # Pass the loop to the thread
+                cancel_event
             )
 
-            # Yield tokens as they arrive
-            while True:
-                try:
-                    token = await asyncio.wait_for(token_queue.get(), timeout=1.0)
-                    if token is None:  # End of stream
-                        break
-                    yield token
-                except asyncio.TimeoutError:
-                    if generation_task.done():
+            # Yield tokens as they arrive, draining everything queued since
+            # the last wakeup as one chunk
+            finished = False
+            while not finished:
+                token = await token_queue.get()
+                if token is None:  # End of stream
+                    break
+                pieces = [token]
+                while not token_queue.empty():
+                    token = token_queue.get_nowait()
+                    if token is None:
+                        finished = True
                         break
-                    continue
+                    pieces.append(token)
+                yield "".join(pieces)
 
             # Wait for generation to complete
             await generation_task
@@ -126,25 +156,46 @@ class ModelManager:
         except Exception as e:
             logger.error(f"Streaming generation failed: {e}")
             raise RuntimeError(f"Streaming generation failed: {e}")
+        finally:
+            # Stop the worker if the consumer went away before the end
+            cancel_event.set()
     
-    def _generate_sync(self, prompt: str, max_tokens: int, temperature: float, stream: bool) -> str:
+    def _generate_sync(self, prompt: str, max_tokens: int, temperature: float) -> Tuple[str, Optional[int]]:
         """Synchronous generation (runs in thread pool)"""
         response = self._model(
             prompt,
             max_tokens=max_tokens,
             temperature=temperature,
-            stream=stream,
+            stream=False,
             echo=False,
             stop=[]  # Empty list allows natural generation end
         )
         
-        if stream:
-            return response
-        else:
-            return response['choices'][0]['text'].strip()
+        usage = response.get('usage') or {}
+        return response['choices'][0]['text'].strip(), usage.get('completion_tokens')
     
-    def _generate_stream_sync(self, prompt: str, max_tokens: int, temperature: float, token_queue: asyncio.Queue, loop):
-        """Synchronous streaming generation (runs in thread pool)"""
+    def _generate_stream_sync(
+        self,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        token_queue: asyncio.Queue,
+        loop,
+        cancel_event: threading.Event
+    ):
+        """
+        Synchronous streaming generation (runs in thread pool)
+        
+        Tokens are handed to the event loop with call_soon_threadsafe, so
+        the worker thread never waits on the loop between tokens. The end
+        of stream sentinel is always sent; errors propagate through the
+        executor future.
+        """
+        deadline = time.monotonic() + STREAM_GENERATION_TIMEOUT_SECONDS
+        
+        def should_stop(input_ids, logits) -> bool:
+            return cancel_event.is_set() or time.monotonic() > deadline
+        
         try:
             stream = self._model(
                 prompt,
@@ -152,36 +203,21 @@ class ModelManager:
                 temperature=temperature,
                 stream=True,
                 echo=False,
-                stop=[]  # Empty list allows natural generation end
+                stop=[],  # Empty list allows natural generation end
+                stopping_criteria=StoppingCriteriaList([should_stop])
             )
             
             for chunk in stream:
-                token = chunk['choices'][0]['text']
-                # Put token in queue (thread-safe) using the passed loop
-                future = asyncio.run_coroutine_threadsafe(
-                    token_queue.put(token), 
-                    loop
-                )
-                # Wait for the future to complete to ensure proper error handling
-                future.result()
-            
-            # Signal end of stream
-            future = asyncio.run_coroutine_threadsafe(
-                token_queue.put(None),
-                loop
-            )
-            future.result()
+                if cancel_event.is_set():
+                    break
+                loop.call_soon_threadsafe(token_queue.put_nowait, chunk['choices'][0]['text'])
             
         except Exception as e:
             logger.error(f"Streaming generation error: {e}")
-            try:
-                future = asyncio.run_coroutine_threadsafe(
-                    token_queue.put(None),
-                    loop
-                )
-                future.result()
-            except Exception:
-                pass  # Ignore errors when signaling end during exception handling
+            raise
+        finally:
+            # Signal end of stream
+            loop.call_soon_threadsafe(token_queue.put_nowait, None)
     
     def create_rag_prompt(self, query: str, context: str) -> str:
         """Create RAG prompt for Phi-2 - Enhanced instruction format"""
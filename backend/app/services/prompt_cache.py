@@ -0,0 +1,182 @@
+import os
+import hashlib
+import logging
+from cachetools import LRUCache
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Only near-deterministic generations are cached by either cache
+PROMPT_CACHE_MAX_TEMPERATURE = 0.1
+
+# Semantic prompt cache settings
+PROMPT_CACHE_MAX_SIZE = int(os.getenv("PROMPT_CACHE_MAX_SIZE", "256"))
+PROMPT_CACHE_SIMILARITY_THRESHOLD = float(os.getenv("PROMPT_CACHE_SIMILARITY_THRESHOLD", "0.92"))
+
+# Exact prompt cache settings
+EXACT_PROMPT_CACHE_MAX_SIZE = int(os.getenv("EXACT_PROMPT_CACHE_MAX_SIZE", "1024"))
+
+class ExactPromptCache:
+    """
+    LRU cache of LLM responses keyed by a digest of the formatted prompt
+
+    Only near-deterministic generations (temperature <= 0.1) are cached, so
+    sampling at higher temperatures still produces fresh responses.
+    Temperatures are bucketed to 0.1 when building the key.
+    """
+
+    def __init__(self, max_size: int = EXACT_PROMPT_CACHE_MAX_SIZE):
+        self._cache: Optional[LRUCache] = LRUCache(maxsize=max_size) if max_size > 0 else None
+
+    def __len__(self) -> int:
+        return len(self._cache) if self._cache is not None else 0
+
+    @staticmethod
+    def make_key(prompt: str, max_tokens: int, temperature: float) -> Optional[bytes]:
+        """
+        Build the cache key for a generation
+
+        Returns:
+            16-byte digest, or None if the temperature is too high to cache
+        """
+        if temperature > PROMPT_CACHE_MAX_TEMPERATURE:
+            return None
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{max_tokens}:{round(temperature, 1)}:".encode())
+        digest.update(prompt.encode())
+        return digest.digest()
+
+    def get(self, key: Optional[bytes]) -> Optional[Any]:
+        """Get a cached response, or None on a miss"""
+        if key is None or self._cache is None:
+            return None
+        return self._cache.get(key)
+
+    def set(self, key: Optional[bytes], response: Any) -> None:
+        """Cache a response under a key from make_key"""
+        if key is None or self._cache is None:
+            return
+        self._cache[key] = response
+
+    def clear(self) -> None:
+        """Drop all cached responses"""
+        if self._cache is not None:
+            self._cache.clear()
+
+class SemanticPromptCache:
+    """
+    LRU cache of LLM responses keyed by prompt embedding similarity
+
+    Prompts are embedded with a normalized encoder, so cosine similarity is
+    a matrix-vector product over the cached embeddings. Embeddings live in a
+    preallocated (max_size, d) float32 ring buffer; slots are bucketed by
+    generation parameters, so a lookup only scores entries generated with
+    equal settings, and the least recently used slot is overwritten when
+    the cache is full.
+    """
+
+    def __init__(
+        self,
+        encoder: Callable[[List[str]], Awaitable[np.ndarray]],
+        max_size: int = PROMPT_CACHE_MAX_SIZE,
+        threshold: float = PROMPT_CACHE_SIMILARITY_THRESHOLD
+    ):
+        self.encoder = encoder
+        self.max_size = max_size
+        self.threshold = threshold
+        self._embeddings: Optional[np.ndarray] = None
+        self._params: List[Optional[Hashable]] = [None] * max_size
+        self._responses: List[Any] = [None] * max_size
+        self._last_used = np.zeros(max(max_size, 0), dtype=np.int64)
+        self._buckets: Dict[Hashable, List[int]] = {}
+        self._size = 0
+        self._clock = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    async def embed(self, prompt: str) -> Optional[np.ndarray]:
+        """
+        Embed a prompt for lookup
+
+        Returns:
+            Normalized float32 embedding, or None if the cache is disabled
+            or the encoder failed
+        """
+        if not self.enabled:
+            return None
+        try:
+            embeddings = await self.encoder([prompt])
+            return np.asarray(embeddings[0], dtype=np.float32)
+        except Exception as e:
+            logger.warning(f"Prompt cache embedding failed: {e}")
+            return None
+
+    def lookup(self, embedding: Optional[np.ndarray], params: Hashable) -> Optional[Any]:
+        """
+        Find a cached response for a semantically equivalent prompt
+
+        Returns:
+            Cached response, or None on a miss
+        """
+        if embedding is None:
+            return None
+        slots = self._buckets.get(params)
+        if not slots:
+            return None
+
+        similarities = self._embeddings[slots] @ embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            return None
+
+        slot = slots[best]
+        self._touch(slot)
+        return self._responses[slot]
+
+    def add(self, embedding: Optional[np.ndarray], params: Hashable, response: Any) -> None:
+        """Cache a response, evicting the least recently used entry when full"""
+        if embedding is None or not self.enabled:
+            return
+
+        if self._embeddings is None:
+            self._embeddings = np.empty((self.max_size, embedding.shape[-1]), dtype=np.float32)
+
+        if self._size < self.max_size:
+            slot = self._size
+            self._size += 1
+        else:
+            slot = int(np.argmin(self._last_used))
+            self._evict(slot)
+
+        self._embeddings[slot] = embedding
+        self._params[slot] = params
+        self._responses[slot] = response
+        self._buckets.setdefault(params, []).append(slot)
+        self._touch(slot)
+
+    def clear(self) -> None:
+        """Drop all cached responses"""
+        self._embeddings = None
+        self._params = [None] * self.max_size
+        self._responses = [None] * self.max_size
+        self._last_used[:] = 0
+        self._buckets.clear()
+        self._size = 0
+        self._clock = 0
+
+    def _touch(self, slot: int) -> None:
+        self._clock += 1
+        self._last_used[slot] = self._clock
+
+    def _evict(self, slot: int) -> None:
+        params = self._params[slot]
+        bucket = self._buckets[params]
+        bucket.remove(slot)
+        if not bucket:
+            del self._buckets[params]
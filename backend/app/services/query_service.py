@@ -1,9 +1,10 @@
 import asyncio
 import logging
 import time
-from typing import Dict, Any, List, Optional, AsyncGenerator
+from typing import Dict, Any, List, Optional, AsyncGenerator, Tuple
 import json
 import re
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
@@ -47,7 +48,8 @@ class QueryService:
         workspace_id: str,
         query: str,
         top_k: Optional[int] = None,
-        min_score: Optional[float] = None
+        min_score: Optional[float] = None,
+        query_embedding: Optional[np.ndarray] = None
     ) -> List[Dict[str, Any]]:
         """
         Search for similar documents in workspace
@@ -57,6 +59,7 @@ class QueryService:
             query: Search query
             top_k: Number of results to return
             min_score: Minimum similarity score
+            query_embedding: Precomputed query embedding, if any
             
         Returns:
             List of similar document chunks
@@ -83,7 +86,8 @@ class QueryService:
                 workspace_id=workspace_id,
                 query=query,
                 k=top_k,
-                score_threshold=min_score
+                score_threshold=min_score,
+                query_embedding=query_embedding
             )
             
             # Results are already filtered by score_threshold in vector_service.search
@@ -171,7 +175,8 @@ class QueryService:
         top_k: Optional[int] = None,
         min_score: Optional[float] = None,
         max_tokens: Optional[int] = None,
-        temperature: Optional[float] = None
+        temperature: Optional[float] = None,
+        query_embedding: Optional[np.ndarray] = None
     ) -> Dict[str, Any]:
         """
         Query documents using RAG pipeline
@@ -184,6 +189,7 @@ class QueryService:
             min_score: Minimum similarity score
             max_tokens: Maximum tokens for response
             temperature: LLM temperature
+            query_embedding: Precomputed query embedding, if any
             
         Returns:
             Query response with sources and metadata
@@ -210,7 +216,8 @@ class QueryService:
                 workspace_id=workspace_id,
                 query=query,
                 top_k=top_k,
-                min_score=min_score
+                min_score=min_score,
+                query_embedding=query_embedding
             )
             
             # Prepare RAG context
@@ -352,9 +359,13 @@ class QueryService:
         workspace_id: str,
         limit: int = 50,
         offset: int = 0
-    ) -> List[Dict[str, Any]]:
+    ) -> Tuple[List[Dict[str, Any]], int]:
         """
-        Get query history for user and workspace
+        Get a page of query history for user and workspace
+        
+        The total is returned alongside the page so a persisted history can
+        fetch both in one scan with a window count, e.g.
+        SELECT ..., COUNT(*) OVER() AS total ... LIMIT ? OFFSET ?
         
         Args:
             user_id: User ID
@@ -363,13 +374,13 @@ class QueryService:
             offset: Results offset
             
         Returns:
-            List of historical queries
+            Tuple of (historical queries, total number of queries)
         """
         # Placeholder implementation - would integrate with database
-        # For now, return empty list
-        return []
+        # For now, return an empty page
+        return [], 0
     
-    def get_workspace_search_stats(self, workspace_id: str) -> Dict[str, Any]:
+    async def get_workspace_search_stats(self, workspace_id: str) -> Dict[str, Any]:
         """
         Get search statistics for workspace
         
@@ -381,10 +392,19 @@ class QueryService:
         """
         try:
             # Get base stats from vector service
-            base_stats = self.vector_service.get_workspace_stats(workspace_id)
+            base_stats = await self.vector_service.get_workspace_stats(workspace_id)
             
-            # Add query-specific stats
+            # Fill index stats from the raw FAISS counts (float32 vectors)
             stats = base_stats.copy()
+            if "faiss_vectors" in stats:
+                vectors = stats["faiss_vectors"]
+                stats.setdefault("total_chunks", vectors)
+                stats.setdefault(
+                    "index_size",
+                    f"{vectors * stats.get('embedding_dimension', 0) * 4 / (1024 * 1024):.1f}MB"
+                )
+            
+            # Add query-specific stats
             stats.update({
                 "avg_query_time_ms": 850,  # Placeholder - would be from metrics
                 "total_queries": 0  # Placeholder - would be from database
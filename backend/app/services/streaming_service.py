@@ -1,9 +1,8 @@
 import asyncio
-import json
 import logging
+import orjson
 import time
 from typing import AsyncGenerator, Dict, Any, Optional, Union
-import traceback
 
 logger = logging.getLogger(__name__)
 
@@ -51,33 +50,22 @@ class StreamingService:
         Returns:
             Formatted SSE message string
         """
-        message_parts = []
-        
-        # Add event type if specified
+        # Header lines
+        header = ""
         if event_type:
-            message_parts.append(f"event: {event_type}")
-        
-        # Add message ID if specified
+            header = "event: " + event_type + "\n"
         if message_id:
-            message_parts.append(f"id: {message_id}")
+            header += "id: " + str(message_id) + "\n"
         
-        # Format data
+        # JSON payloads are escaped by orjson and always fit on one data line
         if isinstance(data, (dict, list)):
-            data_str = json.dumps(data)
-        else:
-            data_str = str(data)
-        
-        # Handle multiline data
-        if '\n' in data_str:
-            for line in data_str.split('\n'):
-                message_parts.append(f"data: {line}")
-        else:
-            message_parts.append(f"data: {data_str}")
+            return header + "data: " + orjson.dumps(data).decode() + "\n\n"
         
-        # Add empty line to complete message
-        message_parts.append("")
-        
-        return '\n'.join(message_parts) + '\n'
+        # Text payloads need one data line per line of text
+        data_str = str(data)
+        if "\n" in data_str:
+            data_str = data_str.replace("\n", "\ndata: ")
+        return header + "data: " + data_str + "\n\n"
     
     async def stream_query_response(
         self,
@@ -194,8 +182,7 @@ class StreamingService:
             yield self._format_sse_message(completion_data, event_type="complete")
             
         except Exception as e:
-            logger.error(f"Streaming query failed: {e}")
-            logger.error(f"Traceback: {traceback.format_exc()}")
+            logger.exception("Streaming query failed")
             
             # Send error event
             error_data = {
@@ -258,9 +245,6 @@ class StreamingService:
                     "metadata": result.get("metadata", {})
                 }
                 yield self._format_sse_message(result_data, event_type="result")
-                
-                # Small delay to make streaming visible
-                await asyncio.sleep(0.01)
             
             # Send completion
             completion_data = {
@@ -270,7 +254,7 @@ class StreamingService:
             yield self._format_sse_message(completion_data, event_type="complete")
             
         except Exception as e:
-            logger.error(f"Streaming search failed: {e}")
+            logger.exception("Streaming search failed")
             
             # Send error event
             error_data = {
@@ -1,5 +1,6 @@
 import os
 import pickle
+import asyncio
 import logging
 from typing import List, Dict, Any, Optional, Tuple
 import numpy as np
@@ -8,6 +9,28 @@ from sentence_transformers import SentenceTransformer
 
 logger = logging.getLogger(__name__)
 
+# Length of the chunk text preview stored alongside each vector
+TEXT_PREVIEW_LENGTH = 200
+
+# Per-workspace content revision, bumped whenever vectors are added or
+# removed. Shared across manager instances so caches keyed on it see every
+# change to a workspace.
+_workspace_revisions: Dict[str, int] = {}
+
+def workspace_revision(workspace_id: str) -> int:
+    """Get the current content revision of a workspace"""
+    return _workspace_revisions.get(str(workspace_id), 0)
+
+def _bump_workspace_revision(workspace_id: str) -> None:
+    workspace_id = str(workspace_id)
+    _workspace_revisions[workspace_id] = _workspace_revisions.get(workspace_id, 0) + 1
+
+def make_text_preview(text: str) -> str:
+    """Truncate chunk text to a short preview for search results"""
+    if len(text) > TEXT_PREVIEW_LENGTH:
+        return text[:TEXT_PREVIEW_LENGTH] + "..."
+    return text
+
 class VectorStoreManager:
     """Workspace-based FAISS vector store manager"""
     
@@ -106,7 +129,10 @@ class VectorStoreManager:
         if self.embedding_model is None:
             await self.initialize()
         
-        embeddings = self.embedding_model.encode(texts, normalize_embeddings=True)
+        # Encoding is CPU-bound; keep it off the event loop
+        embeddings = await asyncio.to_thread(
+            self.embedding_model.encode, texts, normalize_embeddings=True
+        )
         return embeddings.astype(np.float32)
     
     async def add_documents(
@@ -134,8 +160,10 @@ class VectorStoreManager:
             doc_id = current_size + i
             meta['id'] = doc_id
             meta['text'] = texts[i]
+            meta['text_preview'] = make_text_preview(texts[i])
             self.workspace_metadata[workspace_id].append(meta)
             document_ids.append(doc_id)
+        _bump_workspace_revision(workspace_id)
         
         # Save workspace
         await self.save_workspace(workspace_id)
@@ -148,14 +176,23 @@ class VectorStoreManager:
         workspace_id: str, 
         query: str, 
         k: int = 5,
-        score_threshold: float = 0.7
+        score_threshold: float = 0.7,
+        query_embedding: Optional[np.ndarray] = None
     ) -> List[Dict[str, Any]]:
-        """Search for similar documents"""
+        """
+        Search for similar documents
+        
+        A caller that already embedded the query can pass query_embedding
+        to skip encoding it again.
+        """
         if workspace_id not in self.workspace_indices:
             await self.load_workspace(workspace_id)
         
         # Generate query embedding
-        query_embedding = await self.embed_texts([query])
+        if query_embedding is None:
+            query_embedding = await self.embed_texts([query])
+        else:
+            query_embedding = query_embedding.reshape(1, -1)
         
         # Search FAISS index
         scores, indices = self.workspace_indices[workspace_id].search(query_embedding, k)
@@ -232,6 +269,40 @@ class VectorStoreManager:
         
         return results
     
+    async def search_grouped(
+        self,
+        workspace_id: str,
+        query: str,
+        k: int = 5,
+        score_threshold: float = 0.7,
+        group_by: str = "document_id"
+    ) -> List[Dict[str, Any]]:
+        """
+        Search for similar chunks and group them by a metadata key
+        
+        FAISS returns hits in rank order, so the first hit seen for a group
+        carries its best similarity and groups come out already sorted.
+        
+        Returns:
+            List of groups with 'group', 'max_similarity' and 'chunks'
+        """
+        results = await self.search(workspace_id, query, k=k, score_threshold=score_threshold)
+        
+        groups: Dict[Any, Dict[str, Any]] = {}
+        for result in results:
+            key = result.get(group_by)
+            group = groups.get(key)
+            if group is None:
+                groups[key] = {
+                    "group": key,
+                    "max_similarity": result["similarity"],
+                    "chunks": [result]
+                }
+            else:
+                group["chunks"].append(result)
+        
+        return list(groups.values())
+    
     async def delete_document(self, workspace_id: str, document_id: int) -> bool:
         """Delete document from workspace"""
         try:
@@ -252,6 +323,7 @@ class VectorStoreManager:
             
             # Remove from metadata
             del metadata_list[doc_index]
+            _bump_workspace_revision(workspace_id)
             
             # Note: FAISS doesn't support efficient single document deletion
             # For now, we mark as deleted in metadata and rebuild index periodically
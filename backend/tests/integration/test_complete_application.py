@@ -193,9 +193,9 @@ class TestCompleteApplicationWorkflow:
             
             assert response.status_code in [200, 204]
             
-            # Test request timing
+            # Health probes skip request timing
             response = client.get("/health")
-            assert "X-Process-Time" in response.headers
+            assert "X-Process-Time" not in response.headers
 
     # Database Integration Tests
     @pytest.mark.asyncio
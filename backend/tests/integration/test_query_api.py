@@ -402,7 +402,7 @@ class TestQueryAPI:
                 "sources_count": 2
             }
         ]
-        mock_service.get_query_history.return_value = mock_history
+        mock_service.get_query_history.return_value = (mock_history, 2)
         
         response = client.get("/query/history")
         
@@ -428,7 +428,7 @@ class TestQueryAPI:
             "user_id": "user123",
             "workspace_id": "workspace123"
         }
-        mock_service.get_query_history.return_value = []
+        mock_service.get_query_history.return_value = ([], 0)
         
         response = client.get("/query/history?limit=10&offset=20")
         
@@ -241,6 +241,24 @@ class TestAppLifespan:
         
         assert execution_order == [1, 2, 3]
 
+    @pytest.mark.asyncio
+    async def test_startup_non_critical_tasks_concurrent(self, app_lifespan, mock_service_manager):
+        """Test non-critical startup tasks run concurrently"""
+        running = []
+        overlapped = []
+        
+        async def task():
+            running.append(1)
+            await asyncio.sleep(0.01)
+            overlapped.append(len(running))
+        
+        app_lifespan.register_startup_task("task1", task, critical=False)
+        app_lifespan.register_startup_task("task2", task, critical=False)
+        
+        await app_lifespan.startup()
+        
+        assert overlapped == [2, 2]
+
     # Application Shutdown Tests
     @pytest.mark.asyncio
     async def test_shutdown_success(self, app_lifespan, mock_service_manager):
@@ -402,16 +420,28 @@ class TestAppLifespan:
         
         assert app_lifespan.is_healthy() == False
 
+    def test_is_healthy_cached(self, app_lifespan, mock_service_manager):
+        """Test service health is reused within the cache TTL"""
+        app_lifespan.state = LifespanState.RUNNING
+        mock_service_manager.get_services_health.return_value = {"service1": True}
+        
+        assert app_lifespan.is_healthy() == True
+        assert app_lifespan.is_healthy() == True
+        assert mock_service_manager.get_services_health.call_count == 1
+
     def test_get_health_status(self, app_lifespan, mock_service_manager):
         """Test getting detailed health status"""
         app_lifespan.state = LifespanState.RUNNING
-        mock_service_manager.get_services_health.return_value = {
-            "service1": True,
-            "service2": True
-        }
-        mock_service_manager.get_initialization_status.return_value = {
-            "initialized": True,
-            "service_count": 2
+        mock_service_manager.get_full_status.return_value = {
+            "services": {
+                "service1": True,
+                "service2": True
+            },
+            "initialization": {
+                "initialized": True,
+                "service_count": 2
+            },
+            "all_healthy": True
         }
         
         status = app_lifespan.get_health_status()
@@ -423,6 +453,17 @@ class TestAppLifespan:
         assert status["initialization"]["initialized"] == True
 
     # Restart Tests
+    @pytest.mark.asyncio
+    async def test_uptime_tracking(self, app_lifespan, mock_service_manager):
+        """Test uptime is reported only while running"""
+        assert app_lifespan._get_uptime() is None
+        
+        await app_lifespan.startup()
+        assert app_lifespan._get_uptime() >= 0
+        
+        await app_lifespan.shutdown()
+        assert app_lifespan._get_uptime() is None
+
     @pytest.mark.asyncio
     async def test_restart_success(self, app_lifespan, mock_service_manager):
         """Test application restart"""
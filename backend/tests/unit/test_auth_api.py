@@ -0,0 +1,156 @@
+import pytest
+import time
+from unittest.mock import Mock, patch
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.api import auth as auth_api
+from app.auth.auth_service import AuthError
+
+
+class TestTokenVerificationCache:
+    """Test suite for the verified-token cache used by auth dependencies"""
+
+    @pytest.fixture(autouse=True)
+    def clear_token_cache(self):
+        """Start every test with an empty token cache"""
+        auth_api._token_cache.clear()
+        yield
+        auth_api._token_cache.clear()
+
+    @pytest.fixture
+    def payload(self):
+        """Verified token payload"""
+        return {
+            "user_id": 1,
+            "username": "testuser",
+            "workspace_id": 1,
+            "exp": int(time.time()) + 3600
+        }
+
+    @pytest.mark.asyncio
+    async def test_verify_token_cached_reuses_verification(self, payload):
+        """Test repeated verification of the same token hits the cache"""
+        mock_auth_service = Mock()
+        mock_auth_service.verify_token.return_value = payload
+
+        with patch('app.api.auth.auth_service', mock_auth_service):
+            first = await auth_api.verify_token_cached("valid_token")
+            second = await auth_api.verify_token_cached("valid_token")
+
+        assert first == payload
+        assert second == payload
+        mock_auth_service.verify_token.assert_called_once_with("valid_token")
+
+    @pytest.mark.asyncio
+    async def test_verify_token_cached_distinct_tokens(self, payload):
+        """Test different tokens are verified independently"""
+        mock_auth_service = Mock()
+        mock_auth_service.verify_token.return_value = payload
+
+        with patch('app.api.auth.auth_service', mock_auth_service):
+            await auth_api.verify_token_cached("token_a")
+            await auth_api.verify_token_cached("token_b")
+
+        assert mock_auth_service.verify_token.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_verify_token_cached_expired_payload(self, payload):
+        """Test cached payloads past their exp claim are re-verified"""
+        payload["exp"] = int(time.time()) - 1
+        mock_auth_service = Mock()
+        mock_auth_service.verify_token.return_value = payload
+
+        with patch('app.api.auth.auth_service', mock_auth_service):
+            await auth_api.verify_token_cached("expired_token")
+            await auth_api.verify_token_cached("expired_token")
+
+        assert mock_auth_service.verify_token.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_verify_token_cached_invalid_token_not_cached(self):
+        """Test verification failures propagate and are not cached"""
+        mock_auth_service = Mock()
+        mock_auth_service.verify_token.side_effect = AuthError("Invalid token")
+
+        with patch('app.api.auth.auth_service', mock_auth_service):
+            with pytest.raises(AuthError, match="Invalid token"):
+                await auth_api.verify_token_cached("bad_token")
+            with pytest.raises(AuthError, match="Invalid token"):
+                await auth_api.verify_token_cached("bad_token")
+
+        assert len(auth_api._token_cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_get_current_user_from_token_uses_cache(self, payload):
+        """Test the auth dependency verifies a repeated token only once"""
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials="valid_token")
+        mock_auth_service = Mock()
+        mock_auth_service.verify_token.return_value = payload
+
+        mock_user_manager = Mock()
+        mock_user_manager.get_current_user.return_value = {"user_id": 1}
+
+        with patch('app.api.auth.auth_service', mock_auth_service), \
+             patch('app.api.auth.user_manager', mock_user_manager):
+            await auth_api.get_current_user_from_token(credentials)
+            await auth_api.get_current_user_from_token(credentials)
+
+        mock_auth_service.verify_token.assert_called_once_with("valid_token")
+
+    @pytest.mark.asyncio
+    async def test_get_current_user_from_token_uses_claims(self, payload):
+        """Test the auth dependency returns the token claims for the session user"""
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials="valid_token")
+        mock_auth_service = Mock()
+        mock_auth_service.verify_token.return_value = payload
+        mock_user_manager = Mock()
+        mock_user_manager.get_current_user.return_value = {"user_id": 1}
+
+        with patch('app.api.auth.auth_service', mock_auth_service), \
+             patch('app.api.auth.user_manager', mock_user_manager):
+            current_user = await auth_api.get_current_user_from_token(credentials)
+
+        assert current_user == {
+            "user_id": 1,
+            "username": "testuser",
+            "workspace_id": 1
+        }
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("session_user", [None, {"user_id": 2}])
+    async def test_get_current_user_from_token_revoked_session(self, payload, session_user):
+        """Test tokens are rejected once their user is no longer the session user"""
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials="valid_token")
+        mock_auth_service = Mock()
+        mock_auth_service.verify_token.return_value = payload
+        mock_user_manager = Mock()
+        mock_user_manager.get_current_user.return_value = session_user
+
+        with patch('app.api.auth.auth_service', mock_auth_service), \
+             patch('app.api.auth.user_manager', mock_user_manager):
+            with pytest.raises(HTTPException) as exc_info:
+                await auth_api.get_current_user_from_token(credentials)
+
+        assert exc_info.value.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_get_current_user_from_token_invalid_token(self):
+        """Test the auth dependency maps AuthError to 401"""
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials="bad_token")
+        mock_auth_service = Mock()
+        mock_auth_service.verify_token.side_effect = AuthError("Invalid token")
+
+        with patch('app.api.auth.auth_service', mock_auth_service):
+            with pytest.raises(HTTPException) as exc_info:
+                await auth_api.get_current_user_from_token(credentials)
+
+        assert exc_info.value.status_code == 401
+
+    def test_token_cache_key_does_not_store_raw_token(self):
+        """Test cache keys are fixed-size digests of the token"""
+        key = auth_api._token_cache_key("some.jwt.token")
+
+        assert isinstance(key, bytes)
+        assert len(key) == 16
+        assert b"some.jwt.token" not in key
@@ -241,6 +241,65 @@ class TestAuthService:
         with pytest.raises(AuthError, match="Invalid token"):
             auth_service.verify_token(wrong_token)
 
+    def test_verify_token_missing_identity_claims(self, auth_service):
+        """Test JWT token without workspace claim is rejected"""
+        user_data = {"user_id": 1, "username": "testuser"}
+        token = auth_service.create_access_token(user_data)
+        
+        with pytest.raises(AuthError, match="Invalid token"):
+            auth_service.verify_token(token)
+
+    # Password Hashing Tests
+    def test_bcrypt_rounds(self, auth_service):
+        """Test work factor is read from stored bcrypt hashes"""
+        assert auth_service._bcrypt_rounds("$2b$12$" + "a" * 53) == 12
+        assert auth_service._bcrypt_rounds("$2b$10$" + "a" * 53) == 10
+        assert auth_service._bcrypt_rounds("not-a-hash") is None
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("stored_rounds,rehashed", [(4, True), (10, False), (12, False)])
+    async def test_authenticate_user_rehashes_weaker_hashes(self, auth_service, stored_rounds, rehashed):
+        """Test only hashes below the configured work factor are upgraded on login"""
+        mock_database_service = self._login_database_service(f"$2b${stored_rounds:02d}$" + "a" * 53)
+        
+        with patch('app.auth.auth_service.database_service', mock_database_service), \
+             patch('app.auth.auth_service.BCRYPT_ROUNDS', 10), \
+             patch('bcrypt.checkpw', return_value=True), \
+             patch('bcrypt.hashpw', return_value=b'$2b$10$rehashed'):
+            await auth_service.authenticate_user("testuser", "password123")
+        
+        mock_database_service.execute_update.assert_awaited_once()
+        query, params = mock_database_service.execute_update.call_args[0]
+        assert ("password_hash" in query) == rehashed
+        assert params[-1] == 1
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("is_active,password_ok", [(True, False), (False, True)])
+    async def test_authenticate_user_failure_leaves_updated_at(self, auth_service, is_active, password_ok):
+        """Test a rejected login does not write the user row"""
+        mock_database_service = self._login_database_service("$2b$10$" + "a" * 53, is_active=is_active)
+        
+        with patch('app.auth.auth_service.database_service', mock_database_service), \
+             patch('bcrypt.checkpw', return_value=password_ok):
+            with pytest.raises(AuthError):
+                await auth_service.authenticate_user("testuser", "password123")
+        
+        mock_database_service.execute_update.assert_not_awaited()
+
+    @staticmethod
+    def _login_database_service(password_hash, is_active=True):
+        """Mock auth database holding a single user"""
+        mock_database_service = Mock()
+        mock_database_service.execute_query = AsyncMock(return_value={
+            "id": 1,
+            "username": "testuser",
+            "password_hash": password_hash,
+            "workspace_id": "1",
+            "is_active": is_active
+        })
+        mock_database_service.execute_update = AsyncMock(return_value=1)
+        return mock_database_service
+
     # Password Validation Tests
     def test_validate_password_strength_valid(self, auth_service):
         """Test password strength validation - valid passwords"""
@@ -83,7 +83,8 @@ class TestDatabaseManager:
             mock_connect.assert_called_once_with(
                 os.path.join(temp_db_dir, "auth.db"),
                 timeout=30,
-                check_same_thread=False
+                check_same_thread=False,
+                cached_statements=256
             )
 
     def test_create_metadata_database_success(self, db_manager, temp_db_dir):
@@ -99,7 +100,8 @@ class TestDatabaseManager:
             mock_connect.assert_called_once_with(
                 os.path.join(temp_db_dir, "metadata.db"),
                 timeout=30,
-                check_same_thread=False
+                check_same_thread=False,
+                cached_statements=256
             )
 
     def test_create_database_connection_failure(self, db_manager):
@@ -313,6 +315,28 @@ class TestDatabaseManager:
             assert isinstance(script["version"], int)
             assert isinstance(script["script"], str)
 
+    def test_auth_migrations_seed_workspace_id_seq(self, db_manager):
+        """Test migrating an existing auth database seeds and maintains the workspace id counter"""
+        conn = sqlite3.connect(":memory:")
+        conn.execute(db_manager._get_auth_table_schemas()["users"])
+        conn.executemany(
+            "INSERT INTO users (username, email, password_hash, workspace_id) VALUES (?, ?, ?, ?)",
+            [("a", "a@example.com", "x", "3"), ("b", "b@example.com", "x", "12")]
+        )
+        conn.execute("CREATE TABLE schema_version (version INTEGER PRIMARY KEY)")
+        conn.execute("INSERT INTO schema_version (version) VALUES (4)")
+        
+        db_manager._apply_migrations(conn, "auth_db", from_version=4)
+        seeded = conn.execute("SELECT last_id FROM workspace_id_seq").fetchall()
+        conn.execute(
+            "INSERT INTO users (username, email, password_hash, workspace_id) VALUES ('c', 'c@example.com', 'x', '13')"
+        )
+        
+        assert seeded == [(12,)]
+        assert conn.execute("SELECT last_id FROM workspace_id_seq").fetchone() == (13,)
+        assert db_manager._get_schema_version(conn) == db_manager.CURRENT_SCHEMA_VERSION
+        conn.close()
+
     def test_get_migration_scripts_metadata(self, db_manager):
         """Test metadata database migration scripts"""
         scripts = db_manager._get_migration_scripts("metadata_db")
@@ -0,0 +1,112 @@
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+
+from app.services.document_processor_api import DocumentProcessor, DocumentProcessingError
+
+
+class TestDocumentProcessorLifecycle:
+    """Test suite for the pending -> processing -> completed/failed lifecycle"""
+
+    @pytest.fixture
+    def processor(self):
+        """Document processor with a stubbed chunking service"""
+        processor = DocumentProcessor(workspace_id=1)
+        processor.chunking_service = Mock()
+        processor.chunking_service.chunk_pages.return_value = [
+            {"text": "chunk one", "chunk_id": 0, "page_number": 1, "length": 9},
+            {"text": "chunk two", "chunk_id": 1, "page_number": 2, "length": 9}
+        ]
+        return processor
+
+    @pytest.fixture
+    def mock_session(self):
+        """Async database session returned by database_manager.get_session"""
+        session = MagicMock()
+        session.execute = AsyncMock()
+        session.commit = AsyncMock()
+        session.refresh = AsyncMock()
+        context = MagicMock()
+        context.__aenter__ = AsyncMock(return_value=session)
+        context.__aexit__ = AsyncMock(return_value=False)
+        with patch('app.services.document_processor_api.database_manager') as mock_db_manager:
+            mock_db_manager.get_session.return_value = context
+            yield session
+
+    @pytest.fixture
+    def mock_pdf_service(self):
+        """PDF service returning a two-page document"""
+        with patch('app.services.document_processor_api.pdf_service') as mock_service:
+            mock_service.extract_text_from_pdf.return_value = {
+                "text": "page one page two",
+                "metadata": {"page_count": 2},
+                "pages": [{"page_number": 1, "text": "page one"}, {"page_number": 2, "text": "page two"}]
+            }
+            yield mock_service
+
+    @pytest.fixture
+    def mock_vector_store(self):
+        """Vector store accepting every chunk"""
+        with patch('app.services.document_processor_api.vector_store') as mock_store:
+            mock_store.initialize = AsyncMock()
+            mock_store.load_workspace = AsyncMock()
+            mock_store.add_documents = AsyncMock(return_value=[10, 11])
+            yield mock_store
+
+    def _statuses(self, mock_update):
+        return [call.kwargs["processing_status"] for call in mock_update.call_args_list]
+
+    @pytest.mark.asyncio
+    async def test_run_pipeline_completes(self, processor, mock_session, mock_pdf_service, mock_vector_store):
+        """Test a successful run moves the document from processing to completed"""
+        with patch.object(processor, '_update_document', new=AsyncMock()) as mock_update:
+            result = await processor.run_pipeline(5, "/tmp/doc.pdf", "doc.pdf", "a" * 64)
+
+        assert self._statuses(mock_update) == ["processing", "completed"]
+        assert mock_update.call_args.kwargs["total_chunks"] == 2
+        assert mock_update.call_args.kwargs["total_pages"] == 2
+        assert result["processing_status"] == "completed"
+        mock_pdf_service.extract_text_from_pdf.assert_called_once_with("/tmp/doc.pdf")
+        assert mock_session.add.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_run_pipeline_marks_failed(self, processor, mock_session, mock_pdf_service, mock_vector_store):
+        """Test an extraction error moves the document from processing to failed"""
+        mock_pdf_service.extract_text_from_pdf.side_effect = RuntimeError("corrupt PDF")
+
+        with patch.object(processor, '_update_document', new=AsyncMock()) as mock_update:
+            with pytest.raises(DocumentProcessingError, match="corrupt PDF"):
+                await processor.run_pipeline(5, "/tmp/doc.pdf", "doc.pdf", "a" * 64)
+
+        assert self._statuses(mock_update) == ["processing", "failed"]
+        assert mock_update.call_args.kwargs["error_message"] == "corrupt PDF"
+        mock_vector_store.add_documents.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_create_document_rejects_duplicate(self, processor, mock_session, tmp_path):
+        """Test a pending or completed document with the same hash blocks the upload"""
+        file_path = tmp_path / "doc.pdf"
+        file_path.write_bytes(b"%PDF-1.4")
+        mock_session.execute.return_value.first = Mock(
+            return_value=SimpleNamespace(id=5, processing_status="completed")
+        )
+
+        with pytest.raises(DocumentProcessingError, match="already exists"):
+            await processor.create_document(str(file_path), "doc.pdf", "application/pdf", 1)
+
+    @pytest.mark.asyncio
+    async def test_create_document_retries_failed(self, processor, mock_session, tmp_path):
+        """Test re-uploading a failed document resets its row to pending"""
+        file_path = tmp_path / "doc.pdf"
+        file_path.write_bytes(b"%PDF-1.4")
+        mock_session.execute.return_value.first = Mock(
+            return_value=SimpleNamespace(id=5, processing_status="failed")
+        )
+
+        result = await processor.create_document(str(file_path), "doc.pdf", "application/pdf", 1)
+
+        assert result["document_id"] == 5
+        assert result["processing_status"] == "pending"
+        assert mock_session.execute.await_count == 2
+        mock_session.add.assert_not_called()
+        mock_session.commit.assert_awaited_once()
@@ -0,0 +1,126 @@
+import pytest
+import numpy as np
+
+from app.services.prompt_cache import ExactPromptCache, SemanticPromptCache
+
+
+def unit(*values):
+    """Build a normalized float32 embedding"""
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class TestExactPromptCache:
+    """Test suite for ExactPromptCache"""
+
+    def test_identical_prompt_hits(self):
+        """Test an identical low-temperature generation reuses the response"""
+        cache = ExactPromptCache()
+        key = ExactPromptCache.make_key("User: hi", 1024, 0.0)
+        cache.set(key, "Hello")
+
+        assert cache.get(ExactPromptCache.make_key("User: hi", 1024, 0.04)) == "Hello"
+        assert cache.get(ExactPromptCache.make_key("User: hi", 512, 0.0)) is None
+        assert cache.get(ExactPromptCache.make_key("User: hey", 1024, 0.0)) is None
+
+    def test_high_temperature_not_cached(self):
+        """Test sampled generations are never keyed"""
+        cache = ExactPromptCache()
+        key = ExactPromptCache.make_key("User: hi", 1024, 0.7)
+        cache.set(key, "Hello")
+
+        assert key is None
+        assert len(cache) == 0
+
+    def test_evicts_least_recently_used(self):
+        """Test the least recently used entry is evicted when full"""
+        cache = ExactPromptCache(max_size=2)
+        keys = [ExactPromptCache.make_key(f"User: {i}", 1024, 0.0) for i in range(3)]
+        cache.set(keys[0], "zero")
+        cache.set(keys[1], "one")
+        cache.get(keys[0])
+        cache.set(keys[2], "two")
+
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[0]) == "zero"
+
+
+class TestSemanticPromptCache:
+    """Test suite for SemanticPromptCache"""
+
+    @pytest.fixture
+    def embeddings(self):
+        """Fixed embeddings per prompt"""
+        return {
+            "what is faiss": unit(1.0, 0.0, 0.0),
+            "what is faiss?": unit(0.99, 0.05, 0.0),
+            "write a poem": unit(0.0, 1.0, 0.0),
+            "tell a joke": unit(0.0, 0.0, 1.0),
+        }
+
+    @pytest.fixture
+    def cache(self, embeddings):
+        """Cache with a fake encoder"""
+        async def encoder(texts):
+            return np.stack([embeddings[text] for text in texts])
+        return SemanticPromptCache(encoder, max_size=2, threshold=0.92)
+
+    @pytest.mark.asyncio
+    async def test_similar_prompt_hits(self, cache):
+        """Test a near-identical prompt reuses the cached response"""
+        params = (1024, 0.7)
+        cache.add(await cache.embed("what is faiss"), params, "A vector index")
+
+        hit = cache.lookup(await cache.embed("what is faiss?"), params)
+        miss = cache.lookup(await cache.embed("write a poem"), params)
+
+        assert hit == "A vector index"
+        assert miss is None
+
+    @pytest.mark.asyncio
+    async def test_different_params_miss(self, cache):
+        """Test entries only match with equal generation parameters"""
+        cache.add(await cache.embed("what is faiss"), (1024, 0.7), "A vector index")
+
+        assert cache.lookup(await cache.embed("what is faiss"), (256, 0.7)) is None
+
+    @pytest.mark.asyncio
+    async def test_evicts_least_recently_used(self, cache):
+        """Test the least recently used entry is evicted when full"""
+        params = (1024, 0.7)
+        cache.add(await cache.embed("what is faiss"), params, "A vector index")
+        cache.add(await cache.embed("write a poem"), params, "Roses are red")
+        cache.lookup(await cache.embed("what is faiss"), params)
+        cache.add(await cache.embed("tell a joke"), params, "Knock knock")
+
+        assert len(cache) == 2
+        assert cache.lookup(await cache.embed("write a poem"), params) is None
+        assert cache.lookup(await cache.embed("what is faiss"), params) == "A vector index"
+        assert cache.lookup(await cache.embed("tell a joke"), params) == "Knock knock"
+
+    @pytest.mark.asyncio
+    async def test_eviction_reuses_preallocated_slot(self, cache):
+        """Test a full cache overwrites a slot in place and drops empty buckets"""
+        cache.add(await cache.embed("what is faiss"), (1024, 0.0), "A vector index")
+        cache.add(await cache.embed("write a poem"), (256, 0.0), "Roses are red")
+        buffer = cache._embeddings
+        cache.add(await cache.embed("tell a joke"), (256, 0.0), "Knock knock")
+
+        assert cache._embeddings is buffer
+        assert buffer.shape == (2, 3)
+        assert (1024, 0.0) not in cache._buckets
+        assert cache.lookup(await cache.embed("what is faiss"), (1024, 0.0)) is None
+        assert cache.lookup(await cache.embed("write a poem"), (256, 0.0)) == "Roses are red"
+
+    @pytest.mark.asyncio
+    async def test_encoder_failure_disables_lookup(self):
+        """Test encoder errors fall through to a miss"""
+        async def encoder(texts):
+            raise RuntimeError("model unavailable")
+        cache = SemanticPromptCache(encoder)
+
+        embedding = await cache.embed("what is faiss")
+        cache.add(embedding, (1024, 0.7), "A vector index")
+
+        assert embedding is None
+        assert len(cache) == 0
@@ -359,31 +359,48 @@ Popular frameworks for implementing machine learning models include TensorFlow,
     async def test_get_query_history(self, query_service):
         """Test query history retrieval"""
         # This would integrate with database in real implementation
-        history = await query_service.get_query_history(
+        history, total = await query_service.get_query_history(
             user_id="user1",
             workspace_id="workspace1",
             limit=10
         )
         
         assert isinstance(history, list)
-        # For now, empty list as we haven't implemented persistence
+        # For now, empty page as we haven't implemented persistence
         assert len(history) == 0
+        assert total == 0
 
     # Workspace Statistics Tests 
-    def test_get_workspace_search_stats(self, query_service, mock_vector_service):
+    @pytest.mark.asyncio
+    async def test_get_workspace_search_stats(self, query_service, mock_vector_service):
         """Test workspace search statistics"""
-        mock_vector_service.get_workspace_stats.return_value = {
+        mock_vector_service.get_workspace_stats = AsyncMock(return_value={
             "total_documents": 25,
             "total_chunks": 1250,
             "index_size": "15.2MB"
-        }
+        })
         
-        stats = query_service.get_workspace_search_stats("workspace1")
+        stats = await query_service.get_workspace_search_stats("workspace1")
         
         assert stats["total_documents"] == 25
         assert stats["total_chunks"] == 1250
         assert "index_size" in stats
 
+    @pytest.mark.asyncio
+    async def test_get_workspace_search_stats_from_index(self, query_service, mock_vector_service):
+        """Test chunk count and index size derive from raw vector store stats"""
+        mock_vector_service.get_workspace_stats = AsyncMock(return_value={
+            "workspace_id": "workspace1",
+            "total_documents": 3,
+            "faiss_vectors": 1024,
+            "embedding_dimension": 384
+        })
+        
+        stats = await query_service.get_workspace_search_stats("workspace1")
+        
+        assert stats["total_chunks"] == 1024
+        assert stats["index_size"] == "1.5MB"
+
     # Error Handling Tests
     @pytest.mark.asyncio
     async def test_query_validation_empty_query(self, query_service):
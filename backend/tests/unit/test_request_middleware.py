@@ -0,0 +1,51 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.api_integration import RequestMiddleware
+
+
+class TestRequestMiddleware:
+    """Test suite for the combined timing/logging/security-header middleware"""
+
+    @pytest.fixture
+    def client(self):
+        """Test client for an app wrapped in RequestMiddleware"""
+        app = FastAPI()
+        app.add_middleware(RequestMiddleware, access_log=False)
+
+        @app.get("/health")
+        async def health():
+            return {"status": "healthy"}
+
+        @app.get("/test")
+        async def test_endpoint():
+            return {"message": "test"}
+
+        return TestClient(app)
+
+    def test_adds_headers(self, client):
+        """Test regular responses get timing and security headers"""
+        response = client.get("/test")
+
+        assert response.status_code == 200
+        assert "X-Process-Time" in response.headers
+        assert response.headers["X-Frame-Options"] == "DENY"
+        assert response.headers["X-Content-Type-Options"] == "nosniff"
+
+    def test_skips_health(self, client):
+        """Test health probes bypass the middleware"""
+        response = client.get("/health")
+
+        assert response.status_code == 200
+        assert "X-Process-Time" not in response.headers
+        assert "X-Frame-Options" not in response.headers
+
+    @pytest.mark.parametrize("path", ["/docs", "/redoc"])
+    def test_docs_keep_security_headers(self, client, path):
+        """Test the HTML API docs are still served with security headers"""
+        response = client.get(path)
+
+        assert response.status_code == 200
+        assert response.headers["X-Frame-Options"] == "DENY"
+        assert response.headers["X-Content-Type-Options"] == "nosniff"
@@ -503,4 +503,21 @@ class TestServiceManager:
         assert status["initialized"] == True
         assert status["service_count"] == 2
         assert "service1" in status["services"]
-        assert "service2" in status["services"]
\ No newline at end of file
+        assert "service2" in status["services"]
+
+    def test_get_full_status(self, service_manager):
+        """Test combined health and initialization status"""
+        healthy_service = Mock()
+        healthy_service.is_healthy.return_value = True
+        unhealthy_service = Mock()
+        unhealthy_service.is_healthy.return_value = False
+        service_manager._services.update({
+            "service1": healthy_service,
+            "service2": unhealthy_service
+        })
+        
+        status = service_manager.get_full_status()
+        
+        assert status["services"] == {"service1": True, "service2": False}
+        assert status["initialization"]["service_count"] == 2
+        assert status["all_healthy"] == False
@@ -101,8 +101,9 @@ class TestStreamingService:
         data = {"type": "chunk", "content": "test", "index": 1}
         message = streaming_service._format_sse_message(data)
         
-        expected_json = json.dumps(data)
-        assert f"data: {expected_json}\n\n" == message
+        assert message.startswith("data: ")
+        assert message.endswith("\n\n")
+        assert json.loads(message[6:]) == data
 
     def test_format_sse_message_multiline_data(self, streaming_service):
         """Test SSE message formatting with multiline data"""
@@ -1,9 +1,10 @@
 import pytest
+import time
 from unittest.mock import Mock, patch, AsyncMock
 from datetime import datetime
 
 from app.auth.user_manager import UserManager, WorkspaceError
-from app.services.vector_service import vector_store
+from app.services.vector_service import vector_store, _bump_workspace_revision
 
 
 class TestUserManager:
@@ -186,6 +187,58 @@ class TestUserManager:
             assert "session_duration_minutes" in result
             mock_stats.assert_called_once_with("1")
 
+    @pytest.mark.asyncio
+    async def test_get_user_session_stats_duration(self, user_manager, sample_user_session):
+        """Test session duration is measured on the monotonic clock"""
+        user_manager.current_user = sample_user_session
+        user_manager.current_workspace_id = 1
+        user_manager.session_start_time = datetime.utcnow()
+        user_manager._session_start_ns = time.monotonic_ns() - 3 * 60_000_000_000
+        
+        with patch.object(vector_store, 'get_workspace_stats', return_value={}):
+            result = await user_manager.get_user_session_stats()
+        
+        assert result["session_duration_minutes"] == 3
+        assert result["session_start_time"] == user_manager.session_start_time.isoformat()
+
+    @pytest.mark.asyncio
+    async def test_get_user_session_stats_cached(self, user_manager, sample_user_session):
+        """Test workspace stats are reused until the workspace changes"""
+        user_manager.current_user = sample_user_session
+        user_manager.current_workspace_id = 1
+        
+        with patch.object(vector_store, 'get_workspace_stats', return_value={
+            "total_documents": 5,
+            "faiss_vectors": 100,
+            "workspace_id": "1"
+        }) as mock_stats:
+            
+            await user_manager.get_user_session_stats()
+            result = await user_manager.get_user_session_stats()
+            assert result["workspace"]["total_documents"] == 5
+            assert mock_stats.call_count == 1
+            
+            _bump_workspace_revision("1")
+            await user_manager.get_user_session_stats()
+            assert mock_stats.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_mount_user_workspace_preloads_stats(self, user_manager, sample_user_session):
+        """Test mounting warms the workspace stats cache"""
+        with patch.object(vector_store, 'load_workspace', return_value=True), \
+             patch.dict(vector_store.workspace_indices, {"1": Mock()}), \
+             patch.object(vector_store, 'get_workspace_stats', return_value={
+                 "total_documents": 5,
+                 "faiss_vectors": 100,
+                 "workspace_id": "1"
+             }) as mock_stats:
+            
+            await user_manager.mount_user_workspace(sample_user_session)
+            result = await user_manager.get_user_session_stats()
+            
+            assert result["workspace"]["total_documents"] == 5
+            mock_stats.assert_called_once_with("1")
+
     @pytest.mark.asyncio
     async def test_get_user_session_stats_no_user(self, user_manager):
         """Test getting session stats with no authenticated user"""
@@ -221,6 +274,14 @@ class TestUserManager:
             expected = "data/workspaces/workspace_001"
             assert result == expected
 
+    def test_get_workspace_directory_cached(self, user_manager):
+        """Test known workspace directories are not stat'ed again"""
+        with patch('os.path.exists', return_value=True) as mock_exists:
+            user_manager.get_workspace_directory(1)
+            user_manager.get_workspace_directory(1)
+            
+            mock_exists.assert_called_once_with("data/workspaces/workspace_001")
+
     def test_get_workspace_directory_not_exists(self, user_manager):
         """Test getting non-existent workspace directory"""
         with patch('os.path.exists', return_value=False):
@@ -244,7 +305,7 @@ class TestUserManager:
         session_id = user_manager.generate_session_id()
         
         assert isinstance(session_id, str)
-        assert len(session_id) == 32  # UUID4 without hyphens
+        assert len(session_id) == 32  # 16 random bytes, hex-encoded
         
         # Generate another and ensure they're different
         session_id2 = user_manager.generate_session_id()
@@ -264,4 +325,4 @@ class TestUserManager:
         await user_manager.refresh_user_session()
         
         # Session start time should be updated
-        assert user_manager.session_start_time > original_time
\ No newline at end of file
+        assert user_manager.session_start_time > original_time
@@ -4,7 +4,7 @@ import numpy as np
 import tempfile
 import os
 
-from app.services.vector_service import VectorStoreManager
+from app.services.vector_service import VectorStoreManager, make_text_preview, TEXT_PREVIEW_LENGTH, workspace_revision
 
 
 class TestVectorStoreManager:
@@ -57,6 +57,14 @@ class TestVectorStoreManager:
         expected = "data/workspaces/workspace_123/metadata.pkl"
         assert path == expected
     
+    def test_make_text_preview(self):
+        """Test chunk text preview truncation"""
+        short_text = "Short chunk"
+        long_text = "x" * (TEXT_PREVIEW_LENGTH + 50)
+        
+        assert make_text_preview(short_text) == short_text
+        assert make_text_preview(long_text) == "x" * TEXT_PREVIEW_LENGTH + "..."
+    
     @patch('faiss.IndexFlatL2')
     @patch('os.path.exists')
     async def test_load_workspace_new(self, mock_exists, mock_faiss_constructor, vector_manager, mock_faiss_index):
@@ -110,14 +118,17 @@ class TestVectorStoreManager:
             {"filename": "doc1.pdf", "page": 1},
             {"filename": "doc2.pdf", "page": 1}
         ]
+        revision = workspace_revision("123")
         
         with patch.object(vector_manager, 'save_workspace', new_callable=AsyncMock):
             doc_ids = await vector_manager.add_documents("123", texts, metadata)
         
+        assert workspace_revision("123") == revision + 1
         assert len(doc_ids) == 2
         assert doc_ids == [0, 1]
         mock_faiss_index.add.assert_called_once()
         assert len(vector_manager.workspace_metadata["123"]) == 2
+        assert vector_manager.workspace_metadata["123"][0]["text_preview"] == "Document 1 content"
     
     @patch('faiss.IndexFlatL2')
     @patch('os.path.exists')
@@ -146,6 +157,38 @@ class TestVectorStoreManager:
         assert all("similarity" in result for result in results)
         assert all("rank" in result for result in results)
     
+    @pytest.mark.asyncio
+    async def test_search_reuses_query_embedding(self, vector_manager, mock_faiss_index):
+        """Test a precomputed query embedding skips encoding the query again"""
+        mock_faiss_index.search.return_value = (np.array([[0.1]]), np.array([[0]]))
+        vector_manager.workspace_indices["123"] = mock_faiss_index
+        vector_manager.workspace_metadata["123"] = [{"id": 0, "text": "First document"}]
+        query_embedding = np.ones(384, dtype=np.float32)
+        
+        with patch.object(vector_manager, 'embed_texts', new_callable=AsyncMock) as mock_embed:
+            results = await vector_manager.search("123", "test query", k=1, query_embedding=query_embedding)
+        
+        mock_embed.assert_not_called()
+        assert mock_faiss_index.search.call_args[0][0].shape == (1, 384)
+        assert len(results) == 1
+    
+    @pytest.mark.asyncio
+    async def test_search_grouped(self, vector_manager):
+        """Test search hits are grouped by document in rank order"""
+        hits = [
+            {"document_id": "a", "filename": "a.pdf", "similarity": 0.9},
+            {"document_id": "b", "filename": "b.pdf", "similarity": 0.85},
+            {"document_id": "a", "filename": "a.pdf", "similarity": 0.8}
+        ]
+        
+        with patch.object(vector_manager, 'search', new_callable=AsyncMock, return_value=hits):
+            groups = await vector_manager.search_grouped("123", "test query", k=3)
+        
+        assert [group["group"] for group in groups] == ["a", "b"]
+        assert groups[0]["max_similarity"] == 0.9
+        assert len(groups[0]["chunks"]) == 2
+        assert len(groups[1]["chunks"]) == 1
+    
     async def test_get_workspace_stats(self, vector_manager, mock_faiss_index):
         """Test workspace statistics retrieval"""
         vector_manager.workspace_indices["123"] = mock_faiss_index
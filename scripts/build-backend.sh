@@ -74,6 +74,9 @@ hidden_imports = [
     'uvicorn.protocols.websockets.wsproto_impl',
     'uvicorn.loops.auto',
     'uvicorn.loops.asyncio',
+    'uvicorn.loops.uvloop',
+    'uvloop',
+    'httptools',
     'fastapi',
     'fastapi.security',
     'pydantic',